@@ -0,0 +1,206 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .http_cache import CachedBody, make_cached_body
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # bv. Windows: directories kunnen niet geopend worden
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write(path: Path, data: Union[bytes, Iterable[bytes]]) -> None:
+    """
+    Schrijft naar een tijdelijk bestand in dezelfde map, fsynct het en zet
+    het met één rename op zijn plaats: lezers zien ofwel de oude, ofwel de
+    volledige nieuwe inhoud, nooit een half geschreven bestand. `data` mag
+    ook een iterable van chunks zijn (streaming writer).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as fh:
+            if isinstance(data, (bytes, bytearray)):
+                fh.write(data)
+            else:
+                for chunk in data:
+                    fh.write(chunk)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+
+DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
+ILS_GLOB = "bipt_inclusion_list_*_Q*.ils"
+ILS_CACHE_CONTROL = os.getenv("ILS_CACHE_CONTROL", "public, max-age=300, must-revalidate")
+# Geversioneerd manifest (meta.json): wordt als laatste stap van elke publicatie
+# atomisch vervangen; andere workers herladen zodra het verandert
+MANIFEST_FILE = DATA_DIR / "meta.json"
+ILS_NAME_RE = re.compile(r"bipt_inclusion_list_(\d{4})_Q([1-4])\.ils$")
+
+class ArtifactStore:
+    """
+    Houdt de gegenereerde .ils-bestanden in geheugen, met vooraf berekende
+    ETag en gzip/brotli-varianten, zodat /download geen schijf-I/O doet.
+
+    `refresh()` herleest de map; ongewijzigde bestanden (zelfde mtime en
+    grootte) worden niet opnieuw gelezen of gecomprimeerd. Daarnaast houdt de
+    store een catalogus bij (naam, grootte, kwartaal, hash, generatietijd)
+    met een versienummer dat enkel stijgt als de set bestanden verandert;
+    pagina's lezen die catalogus zonder zelf de map te scannen.
+    """
+
+    def __init__(self, directory: Path = DATA_DIR, pattern: str = ILS_GLOB):
+        self.directory = directory
+        self.pattern = pattern
+        self._lock = threading.Lock()
+        self._items: Dict[str, CachedBody] = {}
+        self._stat: Dict[str, tuple] = {}
+        self._catalogue: List[Dict[str, Any]] = []
+        self._catalogue_body: CachedBody = self._build_catalogue_body([], 0)
+        self._notice_seen: Optional[int] = None
+        self.version = 0
+
+    def get(self, name: str) -> Optional[CachedBody]:
+        return self._items.get(name)
+
+    def names(self) -> List[str]:
+        return [entry["name"] for entry in self._catalogue]
+
+    def catalogue(self) -> List[Dict[str, Any]]:
+        return self._catalogue
+
+    def catalogue_body(self) -> CachedBody:
+        return self._catalogue_body
+
+    @staticmethod
+    def _build_catalogue_body(entries: List[Dict[str, Any]], version: int) -> CachedBody:
+        body = json.dumps({"version": version, "files": entries}, indent=2).encode("utf-8")
+        return make_cached_body(
+            body,
+            media_type="application/json",
+            last_modified=max((e["mtime"] for e in entries), default=0.0),
+            headers={"Cache-Control": ILS_CACHE_CONTROL},
+        )
+
+    @staticmethod
+    def _catalogue_entry(name: str, body: bytes, mtime: float) -> Dict[str, Any]:
+        m = ILS_NAME_RE.search(name)
+        return {
+            "name": name,
+            "size": len(body),
+            "publication": f"{m.group(1)}_Q{m.group(2)}" if m else None,
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "generated_at": datetime.fromtimestamp(mtime).isoformat(timespec="seconds"),
+            "mtime": mtime,
+        }
+
+    def refresh(self) -> bool:
+        """
+        Returns True als de set bestanden of hun inhoud veranderd is.
+        """
+        with self._lock:
+            items: Dict[str, CachedBody] = {}
+            stats: Dict[str, tuple] = {}
+            entries: Dict[str, Dict[str, Any]] = {e["name"]: e for e in self._catalogue}
+            for p in self.directory.glob(self.pattern):
+                try:
+                    st = p.stat()
+                except FileNotFoundError:
+                    continue
+                key = (st.st_mtime_ns, st.st_size)
+                if self._stat.get(p.name) == key and p.name in self._items:
+                    items[p.name] = self._items[p.name]
+                else:
+                    try:
+                        body = p.read_bytes()
+                    except FileNotFoundError:
+                        continue
+                    entries[p.name] = self._catalogue_entry(p.name, body, st.st_mtime)
+                    items[p.name] = make_cached_body(
+                        body,
+                        media_type="application/octet-stream",
+                        last_modified=st.st_mtime,
+                        headers={
+                            "Content-Disposition": f'attachment; filename="{p.name}"',
+                            "Cache-Control": ILS_CACHE_CONTROL,
+                        },
+                        etag='"%s"' % entries[p.name]["sha256"][:32],
+                    )
+                stats[p.name] = key
+            changed = stats != self._stat
+            if not changed:
+                return False
+            catalogue = [entries[name] for name in sorted(items)]
+            # in één keer omwisselen: lezers zien altijd een consistente set
+            self._items = items
+            self._stat = stats
+            self._catalogue = catalogue
+            self.version += 1
+            self._catalogue_body = self._build_catalogue_body(catalogue, self.version)
+            return True
+
+    def load_manifest(self) -> Dict[str, Any]:
+        try:
+            return json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def write_manifest(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Verhoogt de versie, legt de huidige .ils-bestanden (naam, grootte,
+        sha256) vast en vervangt het manifest atomisch.
+        """
+        self.refresh()
+        manifest["version"] = int(manifest.get("version", 0)) + 1
+        manifest["files"] = {
+            e["name"]: {"size": e["size"], "sha256": e["sha256"]} for e in self._catalogue
+        }
+        atomic_write(MANIFEST_FILE, json.dumps(manifest, indent=2).encode("utf-8"))
+        self._notice_seen = MANIFEST_FILE.stat().st_mtime_ns
+        return manifest
+
+    def publish(self, files: Dict[str, Union[bytes, Iterable[bytes]]], manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Publicatie in twee stappen: eerst elk bestand atomisch op zijn plaats,
+        daarna het manifest. Readers (ook in andere workers) zien de nieuwe
+        versie pas als het manifest vervangen is.
+        """
+        for name, data in files.items():
+            atomic_write(self.directory / name, data)
+        return self.write_manifest(manifest)
+
+    def check_notice(self) -> bool:
+        """
+        Goedkope poll (één stat op het manifest): herlaadt enkel als een
+        andere worker sinds de vorige check iets gepubliceerd heeft.
+        """
+        try:
+            seen = MANIFEST_FILE.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if seen == self._notice_seen:
+            return False
+        self._notice_seen = seen
+        return self.refresh()
+
+artifact_store = ArtifactStore()
@@ -2,22 +2,47 @@ from __future__ import annotations
 import os
 import re
 import socket
+import hashlib
 import uuid
-import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, date
+from io import BytesIO
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Union
 
-import requests
 import pdfplumber
+import pypdfium2
 from bs4 import BeautifulSoup
 
+from .artifacts import artifact_store
+from .executors import submit_cpu
+from .http_client import http_client
+from .intervals import IntervalSet
+from .xml_stream import encode_chunks, xml_escape
+from .pdf_cache import pdf_cache
+
 BIPT_MICROS_URL = "https://www.bipt.be/consumenten/radiofrequenties/professioneel-gebruik/micro-s"
-UA = "Mozilla/5.0 (compatible; BIPT-WWB-Server/1.0; +https://www.bipt.be/)"
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
-META_FILE = DATA_DIR / "meta.json"
+
+# Aantal zone-PDF's dat tegelijk gedownload wordt
+BIPT_FETCH_CONCURRENCY = int(os.getenv("BIPT_FETCH_CONCURRENCY", "4"))
+# PDF's tot deze grootte blijven in geheugen, grotere gaan naar DATA_DIR/_tmp
+PDF_SPOOL_MAX_BYTES = int(os.getenv("PDF_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+# Hard maximum per zone-PDF
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(64 * 1024 * 1024)))
+PDF_CHUNK_SIZE = 64 * 1024
+# Tekstextractie: "pdfplumber" (layout-analyse), "pdfium" (snel) of "auto"
+# (pdfium, met pdfplumber als fallback als er geen ranges gevonden worden).
+# pdfium is enkel getoetst op gegenereerde PDF's: pas omschakelen nadat
+# bench.bench_extract --pdf op echte BIPT-documenten dezelfde ranges geeft.
+PDF_TEXT_ENGINE = os.getenv("PDF_TEXT_ENGINE", "pdfplumber").strip().lower()
+# Aantal ranges per richting dat in het zone-verschil (meta["last_diff"]) bewaard wordt
+ZONE_DIFF_SAMPLE = int(os.getenv("ZONE_DIFF_SAMPLE", "20"))
+
+# Een PDF als bytes (in geheugen) of als pad (gespilled naar schijf)
+PdfSource = Union[bytes, Path]
 
 PDF_RE = re.compile(
     r"^https?://ihpbpmoqelm\.bipt\.be/micro/files/"
@@ -38,16 +63,72 @@ class PdfItem:
     def key(self) -> Tuple[int,int]:
         return (self.yy, self.quarter)
 
-@dataclass(frozen=True)
-class RangeKHz:
-    start_khz: int
-    end_khz: int
-
 def _fetch_html() -> str:
-    r = requests.get(BIPT_MICROS_URL, headers={"User-Agent": UA}, timeout=30)
+    r = http_client.get(BIPT_MICROS_URL, timeout=30)
     r.raise_for_status()
     return r.text
 
+def _tmp_pdf_path(it: PdfItem, tmp_dir: Path) -> Path:
+    return tmp_dir / f"{it.code}-{it.lang}-{it.yy:02d}-{it.quarter}.pdf"
+
+@dataclass
+class _Download:
+    source: Optional[PdfSource]  # None: 304 Not Modified, gecachte ranges gebruiken
+    sha256: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+def _download_pdf(it: PdfItem, tmp_dir: Path, conditional: bool = True) -> _Download:
+    """
+    Streamt de PDF in een begrensde buffer in geheugen; boven
+    PDF_SPOOL_MAX_BYTES wordt naar een bestand in `tmp_dir` gespilled.
+    Groter dan PDF_MAX_BYTES: RuntimeError.
+    """
+    headers = pdf_cache.conditional_headers(it.url) if conditional else {}
+    with http_client.stream("GET", it.url, headers=headers, timeout=60) as r:
+        if r.status_code == 304:
+            return _Download(source=None)
+        r.raise_for_status()
+        declared = int(r.headers.get("Content-Length") or 0)
+        if declared > PDF_MAX_BYTES:
+            raise RuntimeError(f"PDF te groot ({declared} bytes): {it.url}")
+
+        digest = hashlib.sha256()
+        buf = bytearray()
+        spill_path: Optional[Path] = None
+        spill = None
+        size = 0
+        try:
+            for chunk in r.iter_content(PDF_CHUNK_SIZE):
+                size += len(chunk)
+                if size > PDF_MAX_BYTES:
+                    raise RuntimeError(f"PDF groter dan {PDF_MAX_BYTES} bytes: {it.url}")
+                digest.update(chunk)
+                if spill is None and size > PDF_SPOOL_MAX_BYTES:
+                    tmp_dir.mkdir(parents=True, exist_ok=True)
+                    spill_path = _tmp_pdf_path(it, tmp_dir)
+                    spill = open(spill_path, "wb")
+                    spill.write(buf)
+                    buf = bytearray()
+                if spill is not None:
+                    spill.write(chunk)
+                else:
+                    buf += chunk
+        except BaseException:
+            if spill is not None:
+                spill.close()
+                _safe_delete(spill_path)
+            raise
+        if spill is not None:
+            spill.close()
+
+        return _Download(
+            source=spill_path if spill_path is not None else bytes(buf),
+            sha256=digest.hexdigest(),
+            etag=r.headers.get("ETag"),
+            last_modified=r.headers.get("Last-Modified"),
+        )
+
 def _parse_zone_pdfs(html: str, lang: str = "NL") -> List[PdfItem]:
     soup = BeautifulSoup(html, "html.parser")
     table = soup.find("table", class_=re.compile(r"\btable\b"))
@@ -90,34 +171,57 @@ def _choose_latest_per_zone(items: List[PdfItem]) -> Dict[str, PdfItem]:
 def _mhz_to_khz(s: str) -> int:
     return int(round(float(s.replace(",", ".")) * 1000.0))
 
-def _merge_ranges(ranges: List[RangeKHz]) -> List[RangeKHz]:
-    if not ranges:
-        return []
-    ranges = sorted(ranges, key=lambda r: (r.start_khz, r.end_khz))
-    merged = [ranges[0]]
-    for r in ranges[1:]:
-        last = merged[-1]
-        if r.start_khz <= last.end_khz:
-            merged[-1] = RangeKHz(last.start_khz, max(last.end_khz, r.end_khz))
-        else:
-            merged.append(r)
-    return merged
-
 def _is_free_line(line: str) -> bool:
     u = line.upper()
     return ("VRIJGESTELD" in u) or ("MAXIMUM 10 MW" in u) or ("MAX 10 MW" in u)
 
-def _extract_ranges_split_from_pdf(pdf_path: Path) -> Tuple[List[RangeKHz], List[RangeKHz]]:
-    text_parts: List[str] = []
-    with pdfplumber.open(str(pdf_path)) as pdf:
+def _iter_lines_pdfium(source: PdfSource) -> Iterator[str]:
+    """
+    Snelle extractie: de tekstlaag van pdfium, zonder layout-analyse.
+    """
+    pdf = pypdfium2.PdfDocument(source if isinstance(source, (bytes, bytearray)) else str(source))
+    try:
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_bounded()
+            finally:
+                textpage.close()
+                page.close()
+            # pagina's zonder tabelregels overslaan
+            if "OK" not in text.upper():
+                continue
+            yield from text.splitlines()
+    finally:
+        pdf.close()
+
+def _iter_lines_pdfplumber(source: PdfSource) -> Iterator[str]:
+    """
+    Trage maar robuuste extractie via pdfplumber's layout-analyse.
+    """
+    fp = BytesIO(source) if isinstance(source, (bytes, bytearray)) else str(source)
+    with pdfplumber.open(fp) as pdf:
         for page in pdf.pages:
-            text_parts.append(page.extract_text() or "")
-    text = "\n".join(text_parts)
+            # goedkope check op de ruwe tekens vóór de dure extract_text()
+            raw = "".join(c["text"] for c in page.chars).upper()
+            if "OK" not in raw:
+                page.close()
+                continue
+            text = page.extract_text() or ""
+            page.close()
+            yield from text.splitlines()
 
-    licensed: List[RangeKHz] = []
-    free: List[RangeKHz] = []
+PDF_TEXT_ENGINES: Dict[str, Callable[[PdfSource], Iterator[str]]] = {
+    "pdfium": _iter_lines_pdfium,
+    "pdfplumber": _iter_lines_pdfplumber,
+}
 
-    for line in text.splitlines():
+def _ranges_from_lines(lines: Iterator[str]) -> Tuple[IntervalSet, IntervalSet]:
+    licensed: List[Tuple[int, int]] = []
+    free: List[Tuple[int, int]] = []
+
+    for line in lines:
         line = line.strip()
         if not line or "OK" not in line.upper():
             continue
@@ -132,23 +236,31 @@ def _extract_ranges_split_from_pdf(pdf_path: Path) -> Tuple[List[RangeKHz], List
         fmin_s, fmax_s = nums[-2], nums[-1]
         start_khz = _mhz_to_khz(fmin_s)
         end_khz = _mhz_to_khz(fmax_s)
-        if end_khz < start_khz:
-            start_khz, end_khz = end_khz, start_khz
-        rng = RangeKHz(start_khz, end_khz)
-        (free if _is_free_line(line) else licensed).append(rng)
-
-    return _merge_ranges(licensed), _merge_ranges(free)
-
-def _xml_escape(s: str) -> str:
-    return (
-        s.replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-        .replace("'", "&apos;")
-    )
+        (free if _is_free_line(line) else licensed).append((start_khz, end_khz))
 
-def _build_wwb_xml(list_name: str, groups: List[Tuple[str, List[RangeKHz]]]) -> str:
+    return IntervalSet.from_pairs(licensed), IntervalSet.from_pairs(free)
+
+def _extract_ranges_split_from_pdf(
+    source: PdfSource, engine: Optional[str] = None
+) -> Tuple[IntervalSet, IntervalSet]:
+    engine = engine or PDF_TEXT_ENGINE
+    if engine == "auto":
+        try:
+            licensed, free = _ranges_from_lines(_iter_lines_pdfium(source))
+            if licensed or free:
+                return licensed, free
+        except Exception:
+            pass
+        engine = "pdfplumber"
+    if engine not in PDF_TEXT_ENGINES:
+        raise ValueError(f"Onbekende PDF_TEXT_ENGINE: {engine}")
+    return _ranges_from_lines(PDF_TEXT_ENGINES[engine](source))
+
+def _iter_wwb_xml(list_name: str, groups: List[Tuple[str, IntervalSet]]) -> Iterator[str]:
+    """
+    Genereert het .ils-document regel per regel (elke regel met "\n",
+    behalve de laatste), zodat het nooit volledig in geheugen staat.
+    """
     now = datetime.now()
     date_str = now.strftime("%a %b %d %Y")
     time_str = now.strftime("%H:%M:%S")
@@ -157,29 +269,30 @@ def _build_wwb_xml(list_name: str, groups: List[Tuple[str, List[RangeKHz]]]) ->
     ns = uuid.NAMESPACE_URL
     list_uuid = uuid.uuid5(ns, f"wwb-inclusion-list:{list_name}")
 
-    lines: List[str] = []
-    lines.append('<?xml version="1.0" encoding="UTF-8"?>')
-    lines.append(
-        f'<inclusion_list active="false" user="" date="{_xml_escape(date_str)}" time="{_xml_escape(time_str)}" '
-        f'version="1.0" name="{_xml_escape(list_name)}" machine="{_xml_escape(machine)}" uuid="{list_uuid}">'
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield (
+        f'<inclusion_list active="false" user="" date="{xml_escape(date_str)}" time="{xml_escape(time_str)}" '
+        f'version="1.0" name="{xml_escape(list_name)}" machine="{xml_escape(machine)}" uuid="{list_uuid}">\n'
     )
 
     for group_name, ranges in groups:
         group_uuid = uuid.uuid5(ns, f"wwb-inclusion-group:{list_name}:{group_name}")
-        lines.append(
-            f'    <inclusion_group color="#FFFFFF" version="1.0" name="{_xml_escape(group_name)}" uuid="{group_uuid}">'
-        )
-        lines.append('        <freqs units="KHz" count="0"/>')
-        lines.append(f'        <freq_ranges units="KHz" count="{len(ranges)}">')
-        for r in ranges:
-            lines.append("            <fr>")
-            lines.append(f"                <f>{r.start_khz}</f>")
-            lines.append(f"                <f>{r.end_khz}</f>")
-            lines.append("            </fr>")
-        lines.append("        </freq_ranges>")
-        lines.append("    </inclusion_group>")
-    lines.append("</inclusion_list>")
-    return "\n".join(lines)
+        yield f'    <inclusion_group color="#FFFFFF" version="1.0" name="{xml_escape(group_name)}" uuid="{group_uuid}">\n'
+        yield '        <freqs units="KHz" count="0"/>\n'
+        yield f'        <freq_ranges units="KHz" count="{len(ranges)}">\n'
+        for start_khz, end_khz in ranges:
+            yield (
+                "            <fr>\n"
+                f"                <f>{start_khz}</f>\n"
+                f"                <f>{end_khz}</f>\n"
+                "            </fr>\n"
+            )
+        yield "        </freq_ranges>\n"
+        yield "    </inclusion_group>\n"
+    yield "</inclusion_list>"
+
+def _build_wwb_xml(list_name: str, groups: List[Tuple[str, IntervalSet]]) -> str:
+    return "".join(_iter_wwb_xml(list_name, groups))
 
 def _current_quarter(d: date) -> Tuple[int,int]:
     q = ((d.month - 1) // 3) + 1
@@ -189,13 +302,11 @@ def _quarter_to_int(year: int, q: int) -> int:
     return year * 10 + q
 
 def _load_meta() -> dict:
-    if META_FILE.exists():
-        return json.loads(META_FILE.read_text(encoding="utf-8"))
-    return {}
+    # meta.json is het geversioneerde manifest van de artifact store
+    return artifact_store.load_manifest()
 
 def _save_meta(meta: dict) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    META_FILE.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    artifact_store.write_manifest(meta)
 
 def _safe_delete(path: Path) -> None:
     try:
@@ -205,12 +316,143 @@ def _safe_delete(path: Path) -> None:
             path.unlink()
 
 def list_available_files() -> List[str]:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    return sorted([p.name for p in DATA_DIR.glob("bipt_inclusion_list_*_Q*.ils")])
+    # gecachte catalogus; wordt bijgewerkt door nightly_check_and_update/_cleanup_old_files
+    return artifact_store.names()
+
+@dataclass
+class _ZoneResult:
+    sha256: str
+    # None: zelfde inhoud als de `known` hash, de bewaarde zone-state blijft geldig
+    ranges: Optional[Tuple[IntervalSet, IntervalSet]]
+
+def _fetch_and_parse(
+    zones: List[Tuple[str, PdfItem]], tmp_dir: Path, known: Optional[Dict[str, str]] = None
+) -> Dict[str, _ZoneResult]:
+    """
+    Downloadt de zone-PDF's parallel (begrensd door BIPT_FETCH_CONCURRENCY)
+    en stuurt elke PDF zodra hij binnen is naar de process-pool om te parsen.
+
+    `known` (zone -> sha256 uit de vorige run): zones waarvan de inhoud
+    niet veranderd is worden niet geparsed en ook niet uit de cache gehaald.
+    """
+    known = known or {}
+    parse_futures: Dict[str, Tuple[_Download, Future]] = {}
+    downloads: Dict[str, Future] = {}
+    results: Dict[str, _ZoneResult] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, BIPT_FETCH_CONCURRENCY), thread_name_prefix="bipt-fetch") as pool:
+            downloads = {zone_name: pool.submit(_download_pdf, it, tmp_dir) for zone_name, it in zones}
+            try:
+                for zone_name, it in zones:
+                    dl = downloads[zone_name].result()
+                    sha = dl.sha256 if dl.source is not None else pdf_cache.sha256(it.url)
+                    if sha is not None and known.get(zone_name) == sha:
+                        results[zone_name] = _ZoneResult(sha, None)
+                        continue
+                    cached = pdf_cache.lookup(it.url, dl.sha256)
+                    if sha is not None and cached is not None:
+                        # ongewijzigde PDF (304 of zelfde hash): niet opnieuw parsen
+                        results[zone_name] = _ZoneResult(sha, _ranges_from_cache(cached))
+                        continue
+                    if dl.source is None:
+                        # 304 maar de entry is intussen verdwenen: zonder validators opnieuw halen
+                        dl = _download_pdf(it, tmp_dir, conditional=False)
+                        if known.get(zone_name) == dl.sha256:
+                            results[zone_name] = _ZoneResult(dl.sha256 or "", None)
+                            if isinstance(dl.source, Path):
+                                _safe_delete(dl.source)
+                            continue
+                    # parsing in de process-pool: pdfplumber is CPU-gebonden
+                    parse_futures[zone_name] = (dl, submit_cpu(_extract_ranges_split_from_pdf, dl.source))
+            except Exception:
+                for fut in downloads.values():
+                    fut.cancel()
+                raise
+
+        for (zone_name, it) in zones:
+            if zone_name not in parse_futures:
+                continue
+            dl, fut = parse_futures[zone_name]
+            licensed, free = fut.result()
+            pdf_cache.store(
+                it.url,
+                dl.sha256 or "",
+                dl.etag,
+                dl.last_modified,
+                licensed.to_pairs(),
+                free.to_pairs(),
+            )
+            results[zone_name] = _ZoneResult(dl.sha256 or "", (licensed, free))
+        pdf_cache.save()
+    finally:
+        for _, fut in parse_futures.values():
+            fut.cancel()
+        spilled = [dl for dl, _ in parse_futures.values()]
+        spilled += [f.result() for f in downloads.values() if f.done() and not f.cancelled() and f.exception() is None]
+        for dl in spilled:
+            if isinstance(dl.source, Path):
+                _safe_delete(dl.source)
+    return results
+
+def _ranges_from_cache(cached: Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]) -> Tuple[IntervalSet, IntervalSet]:
+    licensed, free = cached
+    # de cache bewaart genormaliseerde (gesorteerde, disjuncte) ranges
+    return IntervalSet.from_pairs(licensed, presorted=True), IntervalSet.from_pairs(free, presorted=True)
+
+def _diff_summary(s: IntervalSet) -> dict:
+    pairs = s.to_pairs()
+    return {
+        "count": len(pairs),
+        "khz": sum(e - b for b, e in pairs),
+        "sample": pairs[:ZONE_DIFF_SAMPLE],
+    }
+
+def _zone_diff(prev: Optional[dict], state: Optional[dict]) -> dict:
+    """
+    Range-level verschil van één zone tussen twee runs (kHz), voor /debug.
+    """
+    empty: List[Tuple[int, int]] = []
+    old = IntervalSet.from_pairs((prev or {}).get("ranges", empty), presorted=True)
+    new = IntervalSet.from_pairs((state or {}).get("ranges", empty), presorted=True)
+    old_free = IntervalSet.from_pairs((prev or {}).get("free", empty), presorted=True)
+    new_free = IntervalSet.from_pairs((state or {}).get("free", empty), presorted=True)
+    return {
+        "status": "added" if prev is None else "removed" if state is None else "changed",
+        "url": (state or prev or {}).get("url"),
+        "previous_url": prev.get("url") if prev and state and prev.get("url") != state.get("url") else None,
+        "added": _diff_summary(new.difference(old)),
+        "removed": _diff_summary(old.difference(new)),
+        "free_added": _diff_summary(new_free.difference(old_free)),
+        "free_removed": _diff_summary(old_free.difference(new_free)),
+    }
+
+def zone_status() -> dict:
+    """
+    Zone-state en het laatste verschil uit het manifest, voor de debugpagina.
+    """
+    meta = _load_meta()
+    zones = [
+        {
+            "name": name,
+            "url": st.get("url"),
+            "sha256": st.get("sha256", ""),
+            "ranges": len(st.get("ranges", [])),
+            "free": len(st.get("free", [])),
+            "checked_at": st.get("checked_at"),
+            "changed_at": st.get("changed_at"),
+        }
+        for name, st in sorted(meta.get("zones", {}).items(), key=lambda kv: kv[0].lower())
+    ]
+    return {"zones": zones, "last_diff": meta.get("last_diff")}
 
 def nightly_check_and_update(lang: str = "NL", list_name: str = "Belgium (BIPT zones)") -> bool:
     """
     Returns True if a new file was generated/changed, else False.
+
+    Per zone houdt het manifest de URL, de SHA-256 van de PDF en de ranges
+    bij (meta["zones"]). Enkel zones waarvan de bron veranderd is worden
+    opnieuw geparsed; een stil heruitgegeven PDF met dezelfde naam wordt
+    zo ook opgepikt.
     """
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     meta = _load_meta()
@@ -228,44 +470,72 @@ def nightly_check_and_update(lang: str = "NL", list_name: str = "Belgium (BIPT z
 
     last_pub = meta.get("latest_publication")
     new_pub = f"{pub_year}_Q{pub_q}"
-    if last_pub == new_pub:
-        # Still do cleanup based on current date (quarter rollover)
-        _cleanup_old_files()
-        return False
+    out_path = DATA_DIR / f"bipt_inclusion_list_{pub_year}_Q{pub_q}.ils"
 
-    # Generate new .ils
+    # enkel voor PDF's boven PDF_SPOOL_MAX_BYTES
     tmp_dir = DATA_DIR / "_tmp"
-    tmp_dir.mkdir(parents=True, exist_ok=True)
-
-    groups: List[Tuple[str, List[RangeKHz]]] = []
-    free_union: List[RangeKHz] = []
-
-    for zone_name, it in sorted(selected.items(), key=lambda kv: kv[0].lower()):
-        pdf_path = tmp_dir / f"{it.code}-{it.lang}-{it.yy:02d}-{it.quarter}.pdf"
-        # download
-        r = requests.get(it.url, headers={"User-Agent": UA}, timeout=60)
-        r.raise_for_status()
-        pdf_path.write_bytes(r.content)
-
-        licensed, free = _extract_ranges_split_from_pdf(pdf_path)
-        all_usable = _merge_ranges(licensed + free)
 
-        groups.append((zone_name, all_usable))
-        free_union = _merge_ranges(free_union + free)
+    zones = sorted(selected.items(), key=lambda kv: kv[0].lower())
+    prev_zones: Dict[str, dict] = meta.get("zones", {})
+    parsed = _fetch_and_parse(
+        zones, tmp_dir, known={name: st["sha256"] for name, st in prev_zones.items() if st.get("sha256")}
+    )
 
-        _safe_delete(pdf_path)
+    now = datetime.now().isoformat()
+    new_zones: Dict[str, dict] = {}
+    diffs: Dict[str, dict] = {}
+    groups: List[Tuple[str, IntervalSet]] = []
+    frees: List[IntervalSet] = []
+    for zone_name, it in zones:
+        res = parsed[zone_name]
+        prev = prev_zones.get(zone_name)
+        if res.ranges is None and prev is not None:
+            # bron ongewijzigd: groep en vrije ranges uit het manifest
+            state = dict(prev, url=it.url, checked_at=now)
+            group = IntervalSet.from_pairs(state["ranges"], presorted=True)
+            free = IntervalSet.from_pairs(state["free"], presorted=True)
+        else:
+            licensed, free = res.ranges
+            group = licensed.union(free)
+            state = {
+                "url": it.url,
+                "sha256": res.sha256,
+                "ranges": group.to_pairs(),
+                "free": free.to_pairs(),
+                "checked_at": now,
+                "changed_at": now,
+            }
+            diff = _zone_diff(prev, state)
+            if prev is not None and not any(diff[k]["count"] for k in ("added", "removed", "free_added", "free_removed")):
+                # nieuwe bytes (bv. andere PDF-metadata), zelfde ranges
+                state["changed_at"] = prev.get("changed_at", now)
+            else:
+                diffs[zone_name] = diff
+        new_zones[zone_name] = state
+        groups.append((zone_name, group))
+        frees.append(free)
+    for zone_name, prev in prev_zones.items():
+        if zone_name not in new_zones:
+            diffs[zone_name] = _zone_diff(prev, None)
+
+    meta["zones"] = new_zones
+    if diffs:
+        meta["last_diff"] = {"at": now, "publication": new_pub, "zones": diffs}
+
+    if not diffs and last_pub == new_pub:
+        # Geen inhoudelijke wijziging: enkel de zone-state bijwerken
+        _save_meta(meta)
+        # Still do cleanup based on current date (quarter rollover)
+        _cleanup_old_files()
+        return False
 
     # global free group
-    groups.append(("Vrije frequenties", free_union))
+    groups.append(("Vrije frequenties", IntervalSet.union_all(frees)))
 
-    xml = _build_wwb_xml(list_name=list_name, groups=groups)
-    out_path = DATA_DIR / f"bipt_inclusion_list_{pub_year}_Q{pub_q}.ils"
-    out_path.write_text(xml, encoding="utf-8")
-
-    # update meta + cleanup
+    # atomisch publiceren: eerst de .ils (gestreamd), dan het manifest (meta) in één rename
     meta["latest_publication"] = new_pub
-    meta["latest_publication_ts"] = datetime.now().isoformat()
-    _save_meta(meta)
+    meta["latest_publication_ts"] = now
+    artifact_store.publish({out_path.name: encode_chunks(_iter_wwb_xml(list_name, groups))}, meta)
 
     _cleanup_old_files()
     return True
@@ -289,6 +559,7 @@ def _cleanup_old_files() -> None:
 
     keep = {current_tag, next_tag}
 
+    removed = False
     for p in DATA_DIR.glob("bipt_inclusion_list_*_Q*.ils"):
         m = re.search(r"bipt_inclusion_list_(\d{4})_Q([1-4])\.ils$", p.name)
         if not m:
@@ -296,3 +567,10 @@ def _cleanup_old_files() -> None:
         tag = f"{m.group(1)}_Q{m.group(2)}"
         if tag not in keep:
             _safe_delete(p)
+            removed = True
+
+    # catalogus + in-memory store bijwerken; bij verwijderingen ook het manifest
+    if removed:
+        _save_meta(_load_meta())
+    else:
+        artifact_store.refresh()
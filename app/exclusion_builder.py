@@ -1,18 +1,38 @@
 from __future__ import annotations
 
-import base64
+import hashlib
 import html
 import json
 import os
 import re
+import secrets
+import shutil
 import socket
+import threading
 import time
-from io import BytesIO
+import zipfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
-
-import requests
-from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
-from fastapi.responses import FileResponse, HTMLResponse
+from typing import Callable, Iterator
+
+from fastapi import APIRouter, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+
+from .executors import run_io, submit_cpu
+from .freq_normalize import BAND_MAX_MHZ, BAND_MIN_MHZ, normalize
+from .http_cache import cached_response
+from .http_client import Base64Body, http_client
+from .image_prep import IMAGE_MAX_EDGE, Crop, parse_crop, prepare_image
+from .intervals import IntervalSet
+from .job_queue import TERMINAL, Job, JobQueue, QueueFullError
+from .ocr import OCR_LANG, OCR_PSM, OCR_TIMEOUT, Word, run_ocr, tesseract_available
+from .page_cache import page_cache
+from .result_store import OutputFormat, ResultStore
+from .uploads import new_upload_dir, spool_upload
+from .vision_cache import VisionCache, image_signature
+from .xml_stream import encode_chunks
 
 BASE_DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
 EXCLUSION_DATA_DIR = Path(
@@ -21,6 +41,19 @@ EXCLUSION_DATA_DIR = Path(
 
 DEFAULT_MAX_OUTPUT_TOKENS = int(os.getenv("MAX_OUTPUT_TOKENS", "400"))
 DEFAULT_REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "60"))
+# Retries bij 429/5xx of verbindingsfouten (POST wordt standaard niet herhaald)
+OPENAI_RETRIES = int(os.getenv("OPENAI_RETRIES", "2"))
+# Batch: max. pagina's (afbeeldingen, zip-leden, PDF-pagina's), gelijktijdige pagina's,
+# en max. uitgepakte grootte van een zip
+BATCH_MAX_PAGES = int(os.getenv("BATCH_MAX_PAGES", "50"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(200 * 1024 * 1024)))
+# Extractie-engine als het formulier er geen kiest: "openai", "local" (Tesseract) of
+# "auto" (eerst lokaal, naar het vision-model als de OCR-confidence te laag is)
+EXTRACTOR = os.getenv("EXTRACTOR", "openai").strip().lower()
+# "auto": minimale confidence (0..1) van de gevonden waarden om het lokale resultaat te houden
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "0.85"))
+# Pre-processing vóór de vision-call (zie image_prep: verkleinen, encoderen, ...); 0 = origineel doorsturen
 CONVERT_TO_JPEG = os.getenv("CONVERT_TO_JPEG", "1").strip().lower() not in (
     "0",
     "false",
@@ -113,12 +146,14 @@ THEME_STYLE = """<style>
     letter-spacing: .01em;
   }
 
+  h2 { margin: 26px 0 0; font-family: "Manrope", "Space Grotesk", sans-serif; font-size: 1.15rem; }
+
   .lead { margin: 10px 0 0; color: var(--muted); line-height: 1.55; max-width: 75ch; }
   .note { color: var(--muted); margin-top: .7rem; }
   .footer { margin-top: 14px; color: var(--muted); font-size: .92rem; }
 
   label { display: block; margin: 14px 0 6px; font-weight: 700; color: #d5e5ff; }
-  input[type=file], textarea {
+  input[type=file], input[type=text], select, textarea {
     width: 100%;
     border: 1px solid var(--line);
     background: rgba(10, 17, 29, .72);
@@ -192,7 +227,7 @@ INDEX_PAGE = """<!doctype html>
     </header>
     <main class="card">
       <h1>Frequency Exclusion Builder</h1>
-      <p class="lead">Upload an image, extract frequencies with OpenAI, and generate WWB exclusion files.</p>
+      <p class="lead">Upload an image, extract frequencies with OpenAI or local OCR, and generate WWB exclusion files.</p>
       <form action="/exclusion-builder/process" method="post" enctype="multipart/form-data">
         <label for="image">Image</label>
         <input type="file" id="image" name="image" accept="image/*,.heic,.heif,.dng" required />
@@ -200,11 +235,34 @@ INDEX_PAGE = """<!doctype html>
         <label for="prompt">Additional prompt (optional)</label>
         <textarea id="prompt" name="prompt" placeholder="Example: Only include UHF wireless mic channels; ignore stage notes."></textarea>
 
+        <label for="crop">Crop (optional)</label>
+        <input type="text" id="crop" name="crop" placeholder="x0,y0,x1,y1 as fractions, e.g. 0,0.2,1,0.8" />
+
+        <label for="engine">Engine</label>
+        <select id="engine" name="engine">__ENGINE_OPTIONS__</select>
+
         <div class="actions">
           <button class="btn" type="submit">Process</button>
           <a class="btn subtle" href="/">Back to Inclusion Lists</a>
         </div>
       </form>
+
+      <h2>Batch</h2>
+      <p class="note">Several images, a .zip of images or a multi-page PDF: all pages are merged into one result.</p>
+      <form action="/exclusion-builder/batch" method="post" enctype="multipart/form-data">
+        <label for="files">Files</label>
+        <input type="file" id="files" name="files" accept="image/*,.heic,.heif,.dng,.zip,.pdf" multiple required />
+
+        <label for="batch-prompt">Additional prompt (optional)</label>
+        <textarea id="batch-prompt" name="prompt"></textarea>
+
+        <label for="batch-engine">Engine</label>
+        <select id="batch-engine" name="engine">__ENGINE_OPTIONS__</select>
+
+        <div class="actions">
+          <button class="btn" type="submit">Process batch</button>
+        </div>
+      </form>
       <p class="footer">Outputs: CSV, TXT, JSON, FXL</p>
     </main>
   </div>
@@ -275,13 +333,62 @@ ERROR_PAGE = """<!doctype html>
 </body>
 </html>""".replace("__STYLE__", THEME_STYLE)
 
+PENDING_PAGE = """<!doctype html>
+<html lang="en">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>Processing</title>
+  <noscript><meta http-equiv="refresh" content="3" /></noscript>
+  __STYLE__
+</head>
+<body>
+  <div class="wrap">
+    <header class="topbar">
+      <div class="brand">WWB TOOLS</div>
+      <nav class="nav">
+        <a href="/">Inclusion Lists</a>
+        <a href="/exclusion-builder/">Exclusion Builder</a>
+        <a href="/debug">Debug</a>
+      </nav>
+    </header>
+    <main class="card">
+      <h1>Processing image</h1>
+      <p class="note">Status: <span id="stage">__STAGE__</span></p>
+      <p class="footer">This page updates automatically when the result is ready.</p>
+      <div class="actions">
+        <a class="btn subtle" href="/exclusion-builder/">Back</a>
+      </div>
+    </main>
+  </div>
+  <script>
+    (function () {
+      var events = new EventSource("__EVENTS__");
+      events.onmessage = function (e) {
+        var job = JSON.parse(e.data);
+        document.getElementById("stage").textContent = job.stage;
+        if (job.status === "done" || job.status === "error") {
+          events.close();
+          window.location.reload();
+        }
+      };
+    })();
+  </script>
+</body>
+</html>""".replace("__STYLE__", THEME_STYLE)
+
 JOB_RE = re.compile(r"^[A-Za-z0-9_-]+$")
 
 router = APIRouter(prefix="/exclusion-builder", tags=["exclusion-builder"])
 
+_PDFIUM_LOCK = threading.Lock()
 
-def _ensure_output_dir() -> None:
-    EXCLUSION_DATA_DIR.mkdir(parents=True, exist_ok=True)
+# vision-calls lopen als achtergrondjob, niet in de request-handler
+job_queue = JobQueue(EXCLUSION_DATA_DIR / "jobs")
+# Uploads worden hier per request in chunks weggeschreven; de job ruimt zijn map op
+UPLOAD_DIR = EXCLUSION_DATA_DIR / "uploads"
+# herhaalde uploads van dezelfde afbeelding (en prompt) slaan de vision-call over
+vision_cache = VisionCache(EXCLUSION_DATA_DIR / "vision_cache")
 
 
 def _mime_from_filename(filename: str | None) -> str | None:
@@ -307,51 +414,38 @@ def _mime_from_filename(filename: str | None) -> str | None:
     return None
 
 
-def _ensure_jpeg(
-    image_bytes: bytes, mime_type: str | None, filename: str | None
-) -> tuple[bytes, str]:
-    is_jpeg = (mime_type or "").lower() in ("image/jpeg", "image/jpg")
-    if not is_jpeg and filename:
-        lower_name = filename.lower()
-        if lower_name.endswith(".jpg") or lower_name.endswith(".jpeg"):
-            is_jpeg = True
-    if is_jpeg:
-        return image_bytes, "image/jpeg"
+def _openai_model() -> str:
+    return os.environ.get("OPENAI_MODEL", "gpt-4.1-mini")
 
-    try:
-        from PIL import Image
-    except Exception as exc:
-        raise RuntimeError(
-            "Image conversion requires Pillow. Add pillow to requirements."
-        ) from exc
 
-    try:
-        img = Image.open(BytesIO(image_bytes))
-        if img.mode not in ("RGB", "L"):
-            img = img.convert("RGB")
-        out = BytesIO()
-        img.save(out, format="JPEG", quality=92)
-        return out.getvalue(), "image/jpeg"
-    except Exception as exc:
-        raise RuntimeError(
-            "Failed to convert image to JPEG. For HEIC/HEIF or DNG, install extra codecs."
-        ) from exc
-
-
-def _call_openai(image_bytes: bytes, mime_type: str, extra_prompt: str) -> dict:
+def _streamed_json(payload: dict, marker: str, image: bytes | Path, mime_type: str) -> Base64Body:
+    """JSON body whose data URL is base64-encoded chunk by chunk while it is sent.
+
+    `payload` holds the string `marker` exactly once, where the data URL goes.
+    """
+    prefix, found, suffix = json.dumps(payload).partition(json.dumps(marker))
+    if not found or json.dumps(marker) in suffix:
+        raise ValueError("data URL marker must occur exactly once in the payload")
+    return Base64Body(
+        (prefix + '"data:{};base64,'.format(mime_type)).encode("utf-8"),
+        image,
+        ('"' + suffix).encode("utf-8"),
+    )
+
+
+def _call_openai(image: bytes | Path, mime_type: str, extra_prompt: str) -> dict:
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not set")
 
-    model = os.environ.get("OPENAI_MODEL", "gpt-4.1-mini")
-    data_url = "data:{};base64,{}".format(
-        mime_type, base64.b64encode(image_bytes).decode("ascii")
-    )
+    model = _openai_model()
 
     user_prompt = SYSTEM_INSTRUCTION
     if extra_prompt:
         user_prompt = user_prompt + "\n\nAdditional instructions: " + extra_prompt
 
+    # random per request, so a prompt can never contain it
+    marker = "__IMAGE_DATA_URL_{}__".format(secrets.token_hex(16))
     payload = {
         "model": model,
         "input": [
@@ -359,21 +453,22 @@ def _call_openai(image_bytes: bytes, mime_type: str, extra_prompt: str) -> dict:
                 "role": "user",
                 "content": [
                     {"type": "input_text", "text": user_prompt},
-                    {"type": "input_image", "image_url": data_url, "detail": "auto"},
+                    {"type": "input_image", "image_url": marker, "detail": "auto"},
                 ],
             }
         ],
         "max_output_tokens": DEFAULT_MAX_OUTPUT_TOKENS,
     }
 
-    resp = requests.post(
+    resp = http_client.post(
         "https://api.openai.com/v1/responses",
         headers={
             "Authorization": "Bearer " + api_key,
             "Content-Type": "application/json",
         },
-        json=payload,
+        data=_streamed_json(payload, marker, image, mime_type),
         timeout=DEFAULT_REQUEST_TIMEOUT,
+        retries=OPENAI_RETRIES,
     )
     if not resp.ok:
         raise RuntimeError("OpenAI error: {}".format(resp.text))
@@ -412,240 +507,712 @@ def _normalize_value(value: float) -> float:
 
 
 def _normalize_frequencies(payload: dict) -> tuple[list[float], list[list[float]]]:
+    """Bulk-normalize a model payload: parse, kHz/MHz heuristic, band limits,
+    de-duplicate, merge ranges and drop frequencies inside a range (see
+    freq_normalize.normalize). Output is sorted, in MHz on a kHz grid."""
     freqs = payload.get("frequencies_mhz", []) or []
     ranges = payload.get("ranges_mhz", []) or []
+    result = normalize(
+        freqs if isinstance(freqs, (list, tuple)) else [],
+        ranges if isinstance(ranges, (list, tuple)) else [],
+    )
+    return result.freqs_mhz(), result.ranges_mhz()
 
-    normalized_freqs: list[float] = []
-    for freq in freqs:
-        if isinstance(freq, (int, float)):
-            normalized_freqs.append(_normalize_value(float(freq)))
-            continue
-        if isinstance(freq, str):
-            value = (
-                freq.strip().replace("MHz", "").replace("mhz", "").replace(",", "")
-            )
-            try:
-                normalized_freqs.append(_normalize_value(float(value)))
-            except ValueError:
-                pass
 
-    normalized_ranges: list[list[float]] = []
-    for item in ranges:
-        if isinstance(item, (list, tuple)) and len(item) == 2:
-            try:
-                start = _normalize_value(float(item[0]))
-                end = _normalize_value(float(item[1]))
-                if start > end:
-                    start, end = end, start
-                normalized_ranges.append([start, end])
-            except (TypeError, ValueError):
+# Frequentie in tekst: "470.125", "470,125 MHz", "470125 kHz"; niet voorafgegaan of gevolgd
+# door nog een cijfer (ook niet na een scheidingsteken), zodat "CH21" of "1.2.3" niet matcht
+_TEXT_VALUE = r"(?<!\d)(?<!\d[.,])(\d{2,7}(?:[.,]\d{1,4})?)(?!\d|[.,]\d)\s*(mhz|khz)?"
+_TEXT_RANGE_RE = re.compile(_TEXT_VALUE + r"\s*(?:-|–|—|to|tot)\s*" + _TEXT_VALUE, re.IGNORECASE)
+_TEXT_FREQ_RE = re.compile(_TEXT_VALUE, re.IGNORECASE)
+
+
+def _text_value(number: str, unit: str | None, explicit: bool = False) -> float | None:
+    """MHz value of a matched number, or None when it does not look like a frequency."""
+    decimal = "." in number or "," in number
+    if not (decimal or unit or explicit or len(number) >= 5):
+        return None  # los geheel getal: kanaalnummer, aantal, ...
+    value = float(number.replace(",", "."))
+    if unit and unit.lower() == "khz":
+        value /= 1000.0
+    return value
+
+
+def _in_band(value_mhz: float) -> bool:
+    # waarden buiten de band zijn in OCR-tekst bijna altijd iets anders (datum, dB, kanaal)
+    return BAND_MIN_MHZ <= value_mhz <= BAND_MAX_MHZ
+
+
+def _parse_ocr_lines(lines: list[list[Word]]) -> tuple[dict, float]:
+    """Deterministic frequency/range parser for OCR output.
+
+    Returns a payload in the model's shape (for `_normalize_frequencies`) and
+    a confidence in 0..1: the mean over all found values of the lowest OCR
+    word confidence inside that value. Nothing found gives 0.
+    """
+    freqs: list[float] = []
+    ranges: list[list[float]] = []
+    scores: list[float] = []
+    for words in lines:
+        text = ""
+        spans: list[tuple[int, int, float]] = []
+        for word, conf in words:
+            if text:
+                text += " "
+            spans.append((len(text), len(text) + len(word), conf))
+            text += word
+
+        def score(start: int, end: int) -> float:
+            return min((c for s, e, c in spans if s < end and e > start), default=0.0) / 100.0
+
+        for m in _TEXT_RANGE_RE.finditer(text):
+            unit = m.group(2) or m.group(4)
+            # beide kanten van een range tellen, ook zonder decimalen ("470 - 478 MHz")
+            start = _text_value(m.group(1), m.group(2) or unit, explicit=True)
+            end = _text_value(m.group(3), m.group(4) or unit, explicit=True)
+            if start is None or end is None:
                 continue
-            continue
-        if isinstance(item, str):
-            value = item.replace("MHz", "").replace("mhz", "").replace(",", "")
-            parts = re.split(r"[-–]\s*", value)
-            if len(parts) != 2:
+            start, end = _normalize_value(start), _normalize_value(end)
+            if not (_in_band(start) and _in_band(end)):
                 continue
-            try:
-                start = _normalize_value(float(parts[0].strip()))
-                end = _normalize_value(float(parts[1].strip()))
-            except ValueError:
+            ranges.append([start, end])
+            scores.append(score(m.start(), m.end()))
+            text = text[:m.start()] + " " * (m.end() - m.start()) + text[m.end():]
+
+        for m in _TEXT_FREQ_RE.finditer(text):
+            value = _text_value(m.group(1), m.group(2))
+            if value is None or not _in_band(_normalize_value(value)):
                 continue
-            if start > end:
-                start, end = end, start
-            normalized_ranges.append([start, end])
+            freqs.append(value)
+            scores.append(score(m.start(), m.end()))
+
+    confidence = sum(scores) / len(scores) if scores else 0.0
+    return {"frequencies_mhz": freqs, "ranges_mhz": ranges}, round(confidence, 3)
+
+
+@dataclass
+class Extraction:
+    """Frequencies and ranges one extractor found on one image."""
+
+    payload: dict
+    frequencies_mhz: list[float]
+    ranges_mhz: list[list[float]]
+    # 0..1; the vision model has no score and counts as 1.0
+    confidence: float
+    engine: str
+
+
+class Extractor(ABC):
+    """Extraction engine: add one with `register_extractor` to make it selectable."""
+
+    name = ""
+
+    @abstractmethod
+    def available(self) -> bool:
+        """Whether the engine can run here (binary installed, API key set)."""
+
+    def cache_key(self, prompt: str) -> str:
+        """Vision-cache key for results of this engine with this prompt."""
+        return VisionCache.prompt_key(self.name, prompt)
+
+    @abstractmethod
+    def extract(self, image: bytes | Path, mime_type: str, prompt: str) -> Extraction:
+        """Frequencies and ranges found in one image."""
+
+
+class OpenAIExtractor(Extractor):
+    name = "openai"
+
+    def available(self) -> bool:
+        return bool(os.environ.get("OPENAI_API_KEY"))
+
+    def cache_key(self, prompt: str) -> str:
+        return VisionCache.prompt_key(_openai_model(), SYSTEM_INSTRUCTION + "\n" + prompt)
+
+    def extract(self, image: bytes | Path, mime_type: str, prompt: str) -> Extraction:
+        resp_json = _call_openai(image, mime_type, prompt)
+        text = _extract_text_from_response(resp_json)
+        payload = _parse_json_payload(text)
+        freqs, ranges = _normalize_frequencies(payload)
+        return Extraction(payload, freqs, ranges, 1.0, self.name)
+
+
+class LocalOcrExtractor(Extractor):
+    """Tesseract OCR in the process pool plus `_parse_ocr_lines`; ignores the prompt."""
+
+    name = "local"
 
-    return normalized_freqs, normalized_ranges
+    def available(self) -> bool:
+        return tesseract_available()
+
+    def cache_key(self, prompt: str) -> str:
+        return VisionCache.prompt_key("tesseract:{}:{}".format(OCR_LANG, OCR_PSM), "")
+
+    def extract(self, image: bytes | Path, mime_type: str, prompt: str) -> Extraction:
+        ocr = submit_cpu(run_ocr, image).result(timeout=OCR_TIMEOUT + 30)
+        payload, confidence = _parse_ocr_lines(ocr.lines)
+        freqs, ranges = _normalize_frequencies(payload)
+        payload["text"] = ocr.text
+        return Extraction(payload, freqs, ranges, confidence, self.name)
+
+
+EXTRACTORS: dict[str, Extractor] = {}
+# volgorde voor "auto": de eerste beschikbare engine met voldoende confidence wint
+AUTO_CHAIN = ("local", "openai")
+
+
+def register_extractor(extractor: Extractor) -> None:
+    EXTRACTORS[extractor.name] = extractor
+
+
+register_extractor(OpenAIExtractor())
+register_extractor(LocalOcrExtractor())
+
+
+def _engine_chain(engine: str) -> list[Extractor]:
+    if engine != "auto":
+        if engine not in EXTRACTORS:
+            raise ValueError("Unknown extractor: {}".format(engine))
+        return [EXTRACTORS[engine]]
+    chain = [EXTRACTORS[name] for name in AUTO_CHAIN if EXTRACTORS[name].available()]
+    # niets beschikbaar: de laatste geeft dan een duidelijke fout
+    return chain or [EXTRACTORS[AUTO_CHAIN[-1]]]
 
 
 def _format_khz(value_mhz: float) -> str:
     return str(int(round(value_mhz * 1000)))
 
 
-def _write_fxl(path: Path, freqs_mhz: list[float], ranges_mhz: list[list[float]]) -> None:
-    now = time.localtime()
+FXL_COMPAT_ID = "6cbbb7e8-55ab-e4bb-f5c7-1b86242f7fd2"
+
+FXL_CHANNEL = "\n".join(
+    [
+        "        <channel>",
+        '            <frequency units="kHz">{}</frequency>',
+        "            <series>Generic Device - IMD</series>",
+        "            <manufacturer/>",
+        "            <model/>",
+        "            <band>Wideband</band>",
+        "            <tx_profile/>",
+        "            <compat_prof_id>" + FXL_COMPAT_ID + "</compat_prof_id>",
+        "            <source>User defined</source>",
+        "            <notes/>",
+        "            <exclude>1</exclude>",
+        "        </channel>",
+        "",
+    ]
+)
+
+FXL_COMPAT_PROFILES = "\n".join(
+    [
+        "    <compat_profiles>",
+        '        <compat_profile version="0.0.0.1" imd_source="1" synthesizable="0" name="Standard" id="{}">'.format(
+            FXL_COMPAT_ID
+        ),
+        '            <spacing freq_units="KHz">',
+        "                <ch_ch>800</ch_ch>",
+        "                <imd_2t3o>400</imd_2t3o>",
+        "                <imd_2t5o>0</imd_2t5o>",
+        "                <imd_2t7o>0</imd_2t7o>",
+        "                <imd_2t9o>0</imd_2t9o>",
+        "                <imd_3t3o>0</imd_3t3o>",
+        "            </spacing>",
+        '            <filter type="1">',
+        "                <filter_start>-100000</filter_start>",
+        "                <filter_end>100000</filter_end>",
+        "                <filter_center>0</filter_center>",
+        "            </filter>",
+        "        </compat_profile>",
+        "    </compat_profiles>",
+        "",
+    ]
+)
+
+FXL_RANGE = "\n".join(
+    [
+        "        <range>",
+        '            <frequency units="kHz">',
+        "                <start>{}</start>",
+        "                <end>{}</end>",
+        "            </frequency>",
+        "            <source>User defined</source>",
+        "            <notes/>",
+        "            <exclude>1</exclude>",
+        "        </range>",
+        "",
+    ]
+)
+
+
+def _iter_fxl(
+    freqs_mhz: list[float], ranges_mhz: list[list[float]], created: float | None = None
+) -> Iterator[str]:
+    """Yield the FXL document piece by piece (one channel/range per piece).
+
+    `created` stamps the document with the job time instead of the render time.
+    """
+    now = time.localtime(created)
     date_str = time.strftime("%a %b %d %Y", now)
     time_str = time.strftime("%H:%M:%S", now)
     hostname = socket.gethostname()
-    compat_id = "6cbbb7e8-55ab-e4bb-f5c7-1b86242f7fd2"
-
-    freqs_khz = [_format_khz(freq) for freq in freqs_mhz]
-    ranges_khz = [[_format_khz(start), _format_khz(end)] for start, end in ranges_mhz]
 
-    lines = [
-        '<global_exclusions version="1.1" date="{date}" time="{time}" source="{source}" appl_version="7.7.0.117">'.format(
-            date=date_str, time=time_str, source=hostname
-        ),
-        "    <frequency_exclusions>",
-    ]
+    # overlappende exclusion-ranges samenvoegen; WWB sluit dezelfde kHz uit
+    ranges_khz = IntervalSet.from_pairs(
+        (int(round(start * 1000)), int(round(end * 1000))) for start, end in ranges_mhz
+    )
 
-    for freq in freqs_khz:
-        lines.extend(
-            [
-                "        <channel>",
-                '            <frequency units="kHz">{}</frequency>'.format(freq),
-                "            <series>Generic Device - IMD</series>",
-                "            <manufacturer/>",
-                "            <model/>",
-                "            <band>Wideband</band>",
-                "            <tx_profile/>",
-                "            <compat_prof_id>{}</compat_prof_id>".format(compat_id),
-                "            <source>User defined</source>",
-                "            <notes/>",
-                "            <exclude>1</exclude>",
-                "        </channel>",
-            ]
-        )
-    lines.append("    </frequency_exclusions>")
-    lines.append("    <compat_profiles>")
-    lines.extend(
-        [
-            '        <compat_profile version="0.0.0.1" imd_source="1" synthesizable="0" name="Standard" id="{}">'.format(
-                compat_id
-            ),
-            '            <spacing freq_units="KHz">',
-            "                <ch_ch>800</ch_ch>",
-            "                <imd_2t3o>400</imd_2t3o>",
-            "                <imd_2t5o>0</imd_2t5o>",
-            "                <imd_2t7o>0</imd_2t7o>",
-            "                <imd_2t9o>0</imd_2t9o>",
-            "                <imd_3t3o>0</imd_3t3o>",
-            "            </spacing>",
-            '            <filter type="1">',
-            "                <filter_start>-100000</filter_start>",
-            "                <filter_end>100000</filter_end>",
-            "                <filter_center>0</filter_center>",
-            "            </filter>",
-            "        </compat_profile>",
-        ]
+    yield '<global_exclusions version="1.1" date="{date}" time="{time}" source="{source}" appl_version="7.7.0.117">\n'.format(
+        date=date_str, time=time_str, source=hostname
     )
-    lines.append("    </compat_profiles>")
-    lines.append("    <freq_range_exclusions>")
+    yield "    <frequency_exclusions>\n"
+    for freq in freqs_mhz:
+        yield FXL_CHANNEL.format(_format_khz(freq))
+    yield "    </frequency_exclusions>\n"
+    yield FXL_COMPAT_PROFILES
+    yield "    <freq_range_exclusions>\n"
     for start, end in ranges_khz:
-        lines.extend(
-            [
-                "        <range>",
-                '            <frequency units="kHz">',
-                "                <start>{}</start>".format(start),
-                "                <end>{}</end>".format(end),
-                "            </frequency>",
-                "            <source>User defined</source>",
-                "            <notes/>",
-                "            <exclude>1</exclude>",
-                "        </range>",
-            ]
-        )
-    lines.append("    </freq_range_exclusions>")
-    lines.append("</global_exclusions>")
+        yield FXL_RANGE.format(start, end)
+    yield "    </freq_range_exclusions>\n"
+    yield "</global_exclusions>\n"
+
+
+def _result_mhz(result: dict) -> tuple[list[float], list[list[float]]]:
+    freqs = [khz / 1000.0 for khz in result["frequencies_khz"]]
+    ranges = [[start / 1000.0, end / 1000.0] for start, end in result["ranges_khz"]]
+    return freqs, ranges
+
+
+def _iter_list(result: dict, header: str = "") -> Iterator[str]:
+    freqs, ranges = _result_mhz(result)
+    if header:
+        yield header + "\n"
+    for freq in freqs:
+        yield "{:.3f}\n".format(freq)
+    for start, end in ranges:
+        yield "{:.3f}-{:.3f}\n".format(start, end)
+
+
+def _render_csv(result: dict) -> Iterator[bytes]:
+    return encode_chunks(_iter_list(result, header="frequency_mhz"))
 
-    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
+def _render_txt(result: dict) -> Iterator[bytes]:
+    return encode_chunks(_iter_list(result))
 
-def _write_outputs(
+
+def _render_json(result: dict) -> Iterator[bytes]:
+    return encode_chunks(json.JSONEncoder(indent=2).iterencode(result["raw"]))
+
+
+def _render_fxl(result: dict) -> Iterator[bytes]:
+    freqs, ranges = _result_mhz(result)
+    return encode_chunks(_iter_fxl(freqs, ranges, result.get("created")))
+
+
+def _attachment(fmt: str) -> dict[str, str]:
+    return {"Content-Disposition": f'attachment; filename="frequencies.{fmt}"'}
+
+
+# Download formats, rendered in chunks from the stored result on first download.
+OUTPUT_FORMATS = {
+    "csv": OutputFormat(_render_csv, "text/plain; charset=utf-8", _attachment("csv")),
+    "txt": OutputFormat(_render_txt, "text/plain; charset=utf-8", _attachment("txt")),
+    "json": OutputFormat(_render_json, "application/json; charset=utf-8", _attachment("json")),
+    # Force download with .fxl extension; some browsers map XML media types to .xml.
+    "fxl": OutputFormat(
+        _render_fxl,
+        "application/octet-stream",
+        {**_attachment("fxl"), "X-Content-Type-Options": "nosniff"},
+    ),
+}
+
+result_store = ResultStore(EXCLUSION_DATA_DIR, OUTPUT_FORMATS)
+
+
+def _save_result(
     job_id: str,
     freqs: list[float],
     ranges: list[list[float]],
     raw_json: dict,
-) -> dict[str, Path]:
-    _ensure_output_dir()
+) -> None:
+    """Persist the canonical result (one file); download formats are rendered lazily."""
+    result_store.save(
+        job_id,
+        {
+            "frequencies_khz": [int(round(freq * 1000)) for freq in freqs],
+            "ranges_khz": [[int(round(start * 1000)), int(round(end * 1000))] for start, end in ranges],
+            "raw": raw_json,
+            "created": time.time(),
+        },
+    )
 
-    csv_path = EXCLUSION_DATA_DIR / (job_id + ".csv")
-    txt_path = EXCLUSION_DATA_DIR / (job_id + ".txt")
-    json_path = EXCLUSION_DATA_DIR / (job_id + ".json")
-    fxl_path = EXCLUSION_DATA_DIR / (job_id + ".fxl")
 
-    with open(csv_path, "w", encoding="utf-8") as handle:
-        handle.write("frequency_mhz\n")
-        for freq in freqs:
-            handle.write("{:.3f}\n".format(freq))
-        for start, end in ranges:
-            handle.write("{:.3f}-{:.3f}\n".format(start, end))
+def _build_error_page(message: str) -> str:
+    return ERROR_PAGE.replace("__MESSAGE__", html.escape(message))
+
+
+@router.get("/", response_class=HTMLResponse)
+async def exclusion_builder_index(request: Request) -> Response:
+    # statische pagina: één keer gecomprimeerd, daarna enkel ETag/304
+    return cached_response(request, page_cache.get("exclusion-builder", None, _build_index_page))
+
 
-    with open(txt_path, "w", encoding="utf-8") as handle:
-        for freq in freqs:
-            handle.write("{:.3f}\n".format(freq))
-        for start, end in ranges:
-            handle.write("{:.3f}-{:.3f}\n".format(start, end))
+def _build_index_page() -> str:
+    options = ['<option value="">Default ({})</option>'.format(html.escape(EXTRACTOR))]
+    for name in list(EXTRACTORS) + ["auto"]:
+        label = "auto (local, escalate when unsure)" if name == "auto" else name
+        if name != "auto" and not EXTRACTORS[name].available():
+            label += " (unavailable)"
+        options.append('<option value="{}">{}</option>'.format(html.escape(name), html.escape(label)))
+    return INDEX_PAGE.replace("__ENGINE_OPTIONS__", "".join(options))
 
-    with open(json_path, "w", encoding="utf-8") as handle:
-        json.dump(raw_json, handle, indent=2)
 
-    _write_fxl(fxl_path, freqs, ranges)
+def _build_result_page(job_id: str, freqs: list[float], ranges: list[list[float]]) -> str:
+    entries: list[str] = []
+    for freq in freqs:
+        entries.append("        <li>{:.3f} MHz</li>".format(freq))
+    for start, end in ranges:
+        entries.append("        <li>{:.3f} - {:.3f} MHz</li>".format(start, end))
+    if not entries:
+        entries.append("        <li>No frequencies found.</li>")
+
+    body = RESULT_PAGE
+    body = body.replace("__ENTRIES__", "\n".join(entries))
+    body = body.replace(
+        "__CSV__", f"/exclusion-builder/download?job={job_id}&format=csv"
+    )
+    body = body.replace(
+        "__TXT__", f"/exclusion-builder/download?job={job_id}&format=txt"
+    )
+    body = body.replace(
+        "__JSON__", f"/exclusion-builder/download?job={job_id}&format=json"
+    )
+    body = body.replace(
+        "__FXL__", f"/exclusion-builder/download?job={job_id}&format=fxl"
+    )
+    return body
+
+
+def _sha256(image: bytes | Path) -> str:
+    if isinstance(image, bytes):
+        return hashlib.sha256(image).hexdigest()
+    digest = hashlib.sha256()
+    with open(image, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _extract_image(
+    image: bytes | Path,
+    mime_type: str,
+    filename: str | None,
+    prompt: str,
+    crop: Crop | None = None,
+    on_stage: Callable[[str], None] | None = None,
+    engine: str | None = None,
+) -> dict:
+    """Prepare one image (bytes or a spooled file) and extract its frequencies.
+
+    `engine` is an EXTRACTORS name or "auto" (default: EXTRACTOR). Every
+    engine checks the vision cache first; in "auto" a result below
+    OCR_MIN_CONFIDENCE escalates to the next engine, and the best result so
+    far is kept if that one fails.
+    """
+    chain = _engine_chain(engine or EXTRACTOR)
+    if CONVERT_TO_JPEG:
+        if on_stage:
+            on_stage("preparing")
+        prepared = prepare_image(image, mime_type, filename, crop)
+        image, mime_type = prepared.data, prepared.mime_type
+
+    sha256 = _sha256(image)
+    signature = image_signature(image)
+    fallback: dict | None = None
+    for index, extractor in enumerate(chain):
+        last = index == len(chain) - 1
+        cache_key = extractor.cache_key(prompt)
+        cached = vision_cache.lookup(sha256, cache_key, signature)
+        if cached is not None:
+            result = dict({"engine": extractor.name, "confidence": 1.0}, **cached, cached=True)
+        else:
+            if on_stage:
+                on_stage("extracting ({})".format(extractor.name))
+            try:
+                found = extractor.extract(image, mime_type, prompt)
+            except Exception:
+                if last and fallback is None:
+                    raise
+                if last:
+                    return fallback
+                continue
+            stored = {
+                "payload": found.payload,
+                "frequencies_mhz": found.frequencies_mhz,
+                "ranges_mhz": found.ranges_mhz,
+                "engine": found.engine,
+                "confidence": found.confidence,
+            }
+            vision_cache.store(sha256, cache_key, signature, stored)
+            result = dict(stored, cached=False)
+        if last or result["confidence"] >= OCR_MIN_CONFIDENCE:
+            return dict(result, escalated=index > 0)
+        fallback = dict(result, escalated=False)
+    return fallback
+
+
+def _process_image(
+    job: Job,
+    image: Path,
+    mime_type: str,
+    filename: str | None,
+    prompt: str,
+    crop: Crop | None = None,
+    engine: str | None = None,
+) -> dict:
+    # draait in de job-pool: Pillow en de OpenAI-call blokkeren de event loop niet
+    try:
+        extracted = _extract_image(
+            image, mime_type, filename, prompt, crop,
+            on_stage=lambda stage: job_queue.update(job, stage=stage),
+            engine=engine,
+        )
+    finally:
+        shutil.rmtree(image.parent, ignore_errors=True)
+    freqs, ranges = extracted["frequencies_mhz"], extracted["ranges_mhz"]
 
+    job_queue.update(job, stage="writing")
+    _save_result(job.id, freqs, ranges, extracted["payload"])
     return {
-        "csv": csv_path,
-        "txt": txt_path,
-        "json": json_path,
-        "fxl": fxl_path,
+        "frequencies_mhz": freqs,
+        "ranges_mhz": ranges,
+        "cached": extracted["cached"],
+        "engine": extracted["engine"],
+        "confidence": extracted["confidence"],
     }
 
 
-def _build_error_page(message: str) -> str:
-    return ERROR_PAGE.replace("__MESSAGE__", html.escape(message))
+def _expand_upload(path: Path, mime_type: str, filename: str | None) -> Iterator[tuple[str, Path, str]]:
+    """Yield (name, file, mime type) per page: images as-is, zip members, PDF pages.
+
+    Zip members and rendered PDF pages are written next to the upload, so a
+    batch never holds more than one chunk or page in memory.
+    """
+    name = filename or "upload"
+    lower = name.lower()
+    if lower.endswith(".zip") or mime_type in ("application/zip", "application/x-zip-compressed"):
+        with zipfile.ZipFile(path) as archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir()
+                and _mime_from_filename(info.filename) is not None
+                and not info.filename.startswith("__MACOSX/")
+                and not Path(info.filename).name.startswith("._")
+            ]
+            if sum(info.file_size for info in members) > BATCH_MAX_BYTES:
+                raise ValueError("{}: archive too large when extracted".format(name))
+            for index, info in enumerate(sorted(members, key=lambda i: i.filename)):
+                target = path.with_name("{}.m{}".format(path.name, index))
+                with archive.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                yield "{}/{}".format(name, info.filename), target, _mime_from_filename(info.filename)
+        return
+    if lower.endswith(".pdf") or mime_type == "application/pdf":
+        yield from _render_pdf_pages(path, name)
+        return
+    yield name, path, mime_type
+
+
+def _render_pdf_pages(path: Path, name: str) -> Iterator[tuple[str, Path, str]]:
+    import pypdfium2
+
+    # pdfium is niet thread-safe; batches kunnen parallel lopen
+    with _PDFIUM_LOCK:
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            pages: list[Path] = []
+            for index in range(min(len(pdf), BATCH_MAX_PAGES)):
+                page = pdf[index]
+                try:
+                    scale = IMAGE_MAX_EDGE / max(page.get_size())
+                    bitmap = page.render(scale=scale)
+                    target = path.with_name("{}.p{}.jpg".format(path.name, index + 1))
+                    bitmap.to_pil().convert("RGB").save(target, format="JPEG", quality=90)
+                    pages.append(target)
+                finally:
+                    page.close()
+        finally:
+            pdf.close()
+    for index, page_path in enumerate(pages, start=1):
+        yield "{}#p{}".format(name, index), page_path, "image/jpeg"
+
+
+def _merge_results(results: list[dict]) -> tuple[list[float], list[list[float]]]:
+    # zelfde bulknormalisatie als per pagina: ontdubbelen, ranges samenvoegen, gedekte frequenties weg
+    merged = normalize(
+        [f for r in results for f in r["frequencies_mhz"]],
+        [rng for r in results for rng in r["ranges_mhz"]],
+    )
+    return merged.freqs_mhz(), merged.ranges_mhz()
 
 
-@router.get("/", response_class=HTMLResponse)
-async def exclusion_builder_index() -> HTMLResponse:
-    return HTMLResponse(INDEX_PAGE)
+def _process_batch(
+    job: Job,
+    uploads: list[tuple[Path, str, str | None]],
+    prompt: str,
+    crop: Crop | None = None,
+    engine: str | None = None,
+) -> dict:
+    try:
+        return _run_batch(job, uploads, prompt, crop, engine)
+    finally:
+        if uploads:
+            shutil.rmtree(uploads[0][0].parent, ignore_errors=True)
+
+
+def _run_batch(
+    job: Job,
+    uploads: list[tuple[Path, str, str | None]],
+    prompt: str,
+    crop: Crop | None,
+    engine: str | None,
+) -> dict:
+    job_queue.update(job, stage="reading pages")
+    pages: list[tuple[str, Path, str]] = []
+    for path, mime_type, filename in uploads:
+        for page in _expand_upload(path, mime_type, filename):
+            pages.append(page)
+            if len(pages) > BATCH_MAX_PAGES:
+                raise ValueError("Too many pages (max {})".format(BATCH_MAX_PAGES))
+    if not pages:
+        raise ValueError("No images found in the upload")
+
+    def run(page: tuple[str, Path, str]) -> dict:
+        name, data, mime_type = page
+        t0 = time.perf_counter()
+        try:
+            extracted = _extract_image(data, mime_type, name, prompt, crop, engine=engine)
+        except Exception as exc:
+            return {"source": name, "seconds": round(time.perf_counter() - t0, 3), "error": str(exc)}
+        return dict(extracted, source=name, seconds=round(time.perf_counter() - t0, 3))
+
+    # begrensde fan-out; de HTTP-client begrenst daarnaast per host
+    done = 0
+    results: list[dict] = [{}] * len(pages)
+    with ThreadPoolExecutor(max_workers=max(1, BATCH_CONCURRENCY), thread_name_prefix="batch") as pool:
+        futures = {pool.submit(run, page): index for index, page in enumerate(pages)}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+            done += 1
+            job_queue.update(job, stage="page {}/{}".format(done, len(pages)))
+
+    ok = [r for r in results if "error" not in r]
+    if not ok:
+        raise RuntimeError("All pages failed: {}".format(results[0]["error"]))
+    freqs, ranges = _merge_results(ok)
+    summary = [
+        {
+            "page": index,
+            "source": r["source"],
+            "seconds": r["seconds"],
+            "cached": r.get("cached", False),
+            "engine": r.get("engine"),
+            "frequencies": len(r.get("frequencies_mhz", [])),
+            "ranges": len(r.get("ranges_mhz", [])),
+            "error": r.get("error"),
+        }
+        for index, r in enumerate(results, start=1)
+    ]
+    raw = {
+        "frequencies_mhz": freqs,
+        "ranges_mhz": ranges,
+        "pages": [
+            dict(page, payload=r.get("payload")) for page, r in zip(summary, results)
+        ],
+    }
+
+    job_queue.update(job, stage="writing")
+    _save_result(job.id, freqs, ranges, raw)
+    return {"frequencies_mhz": freqs, "ranges_mhz": ranges, "pages": summary}
+
+
+def _job_links(job_id: str) -> dict[str, str]:
+    base = f"/exclusion-builder/jobs/{job_id}"
+    return {"page_url": base, "status_url": base + "/status", "events_url": base + "/events"}
+
+
+def _wants_json(request: Request) -> bool:
+    accept = request.headers.get("Accept", "")
+    return "application/json" in accept and "text/html" not in accept
+
+
+def _enqueue(request: Request, fn: Callable[[Job], dict], upload_dir: Path | None = None) -> Response:
+    try:
+        job = job_queue.submit(fn)
+    except QueueFullError as exc:
+        if upload_dir is not None:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        if _wants_json(request):
+            return JSONResponse({"error": str(exc)}, status_code=503, headers={"Retry-After": "10"})
+        return HTMLResponse(
+            _build_error_page("Server busy: {}".format(str(exc))),
+            status_code=503,
+            headers={"Retry-After": "10"},
+        )
+
+    links = _job_links(job.id)
+    if _wants_json(request):
+        return JSONResponse({"job": job.id, "status": job.status, **links}, status_code=202)
+    return RedirectResponse(url=links["page_url"], status_code=303)
+
+
+def _parse_crop_field(crop: str) -> Crop | None:
+    try:
+        return parse_crop(crop)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid crop: {}".format(exc))
+
+
+def _parse_engine_field(engine: str) -> str | None:
+    engine = engine.strip().lower()
+    if engine and engine != "auto" and engine not in EXTRACTORS:
+        raise HTTPException(status_code=400, detail="Unknown engine: {}".format(engine))
+    return engine or None
+
+
+def _upload_mime(upload: UploadFile) -> str:
+    return (
+        upload.content_type
+        or _mime_from_filename(upload.filename)
+        or "application/octet-stream"
+    )
 
 
 @router.post("/process", response_class=HTMLResponse)
 async def exclusion_builder_process(
+    request: Request,
     image: UploadFile = File(...),
     prompt: str = Form(default=""),
-) -> HTMLResponse:
+    crop: str = Form(default=""),
+    engine: str = Form(default=""),
+) -> Response:
     try:
-        image_bytes = await image.read()
-        if not image_bytes:
+        crop_box = _parse_crop_field(crop)
+        engine_name = _parse_engine_field(engine)
+
+        # in chunks naar schijf, niet in geheugen; de job leest van daar
+        upload_dir = await run_io(new_upload_dir, UPLOAD_DIR)
+        path = upload_dir / "upload"
+        if not await spool_upload(image, path):
+            shutil.rmtree(upload_dir, ignore_errors=True)
             raise HTTPException(status_code=400, detail="Invalid image")
 
-        mime_type = (
-            image.content_type
-            or _mime_from_filename(image.filename)
-            or "application/octet-stream"
+        mime_type = _upload_mime(image)
+        filename = image.filename
+        return _enqueue(
+            request,
+            lambda job: _process_image(job, path, mime_type, filename, prompt, crop_box, engine_name),
+            upload_dir,
         )
-
-        try:
-            if CONVERT_TO_JPEG:
-                image_bytes, mime_type = _ensure_jpeg(
-                    image_bytes, mime_type, image.filename
-                )
-
-            resp_json = _call_openai(image_bytes, mime_type, prompt)
-            text = _extract_text_from_response(resp_json)
-            payload = _parse_json_payload(text)
-            freqs, ranges = _normalize_frequencies(payload)
-            job_id = str(int(time.time() * 1000))
-            _write_outputs(job_id, freqs, ranges, payload)
-        except Exception as exc:
-            return HTMLResponse(
-                _build_error_page("Processing error: {}".format(str(exc))),
-                status_code=500,
-            )
-
-        entries: list[str] = []
-        for freq in freqs:
-            entries.append("        <li>{:.3f} MHz</li>".format(freq))
-        for start, end in ranges:
-            entries.append("        <li>{:.3f} - {:.3f} MHz</li>".format(start, end))
-        if not entries:
-            entries.append("        <li>No frequencies found.</li>")
-
-        body = RESULT_PAGE
-        body = body.replace("__ENTRIES__", "\n".join(entries))
-        body = body.replace(
-            "__CSV__", f"/exclusion-builder/download?job={job_id}&format=csv"
-        )
-        body = body.replace(
-            "__TXT__", f"/exclusion-builder/download?job={job_id}&format=txt"
-        )
-        body = body.replace(
-            "__JSON__", f"/exclusion-builder/download?job={job_id}&format=json"
-        )
-        body = body.replace(
-            "__FXL__", f"/exclusion-builder/download?job={job_id}&format=fxl"
-        )
-        return HTMLResponse(body)
     finally:
         # Explicitly close Starlette's upload handle so any spooled temp file is removed.
         try:
@@ -654,37 +1221,120 @@ async def exclusion_builder_process(
             pass
 
 
+@router.post("/batch", response_class=HTMLResponse)
+async def exclusion_builder_batch(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    prompt: str = Form(default=""),
+    crop: str = Form(default=""),
+    engine: str = Form(default=""),
+) -> Response:
+    try:
+        crop_box = _parse_crop_field(crop)
+        engine_name = _parse_engine_field(engine)
+        if len(files) > BATCH_MAX_PAGES:
+            raise HTTPException(status_code=400, detail="Too many files (max {})".format(BATCH_MAX_PAGES))
+
+        upload_dir = await run_io(new_upload_dir, UPLOAD_DIR)
+        uploads: list[tuple[Path, str, str | None]] = []
+        for index, upload in enumerate(files):
+            path = upload_dir / str(index)
+            if await spool_upload(upload, path):
+                uploads.append((path, _upload_mime(upload), upload.filename))
+        if not uploads:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            raise HTTPException(status_code=400, detail="No files uploaded")
+
+        return _enqueue(
+            request,
+            lambda job: _process_batch(job, uploads, prompt, crop_box, engine_name),
+            upload_dir,
+        )
+    finally:
+        for upload in files:
+            try:
+                await upload.close()
+            except Exception:
+                pass
+
+
+def _get_job(job_id: str) -> dict:
+    if not JOB_RE.match(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job id")
+    snap = job_queue.get(job_id)
+    if snap is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return snap
+
+
+@router.get("/jobs/{job_id}", response_class=HTMLResponse)
+async def exclusion_builder_job(job_id: str) -> HTMLResponse:
+    snap = _get_job(job_id)
+    if snap["status"] == "done":
+        result = snap["result"]
+        return HTMLResponse(_build_result_page(job_id, result["frequencies_mhz"], result["ranges_mhz"]))
+    if snap["status"] == "error":
+        return HTMLResponse(
+            _build_error_page("Processing error: {}".format(snap["error"])),
+            status_code=500,
+        )
+    body = PENDING_PAGE.replace("__STAGE__", html.escape(snap["stage"]))
+    body = body.replace("__EVENTS__", _job_links(job_id)["events_url"])
+    return HTMLResponse(body, headers={"Cache-Control": "no-store"})
+
+
+@router.get("/jobs/{job_id}/status")
+async def exclusion_builder_job_status(job_id: str) -> JSONResponse:
+    snap = _get_job(job_id)
+    return JSONResponse(dict(snap, **_job_links(job_id)), headers={"Cache-Control": "no-store"})
+
+
+@router.get("/jobs/{job_id}/events")
+async def exclusion_builder_job_events(job_id: str, request: Request) -> StreamingResponse:
+    snap = _get_job(job_id)
+
+    async def stream():
+        current = snap
+        while True:
+            yield "data: {}\n\n".format(json.dumps(current))
+            if current["status"] in TERMINAL:
+                return
+            while True:
+                if await request.is_disconnected():
+                    return
+                nxt = await job_queue.wait(job_id, current["version"])
+                if nxt is None:
+                    return
+                if nxt["version"] != current["version"]:
+                    break
+                # heartbeat zodat proxies de verbinding open houden
+                yield ": ping\n\n"
+            current = nxt
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/download")
 async def exclusion_builder_download(
+    request: Request,
     job: str = Query(...),
     format: str = Query(...),
 ):
     if not JOB_RE.match(job):
         raise HTTPException(status_code=400, detail="Invalid job id")
 
-    allowed = {"csv", "txt", "json", "fxl"}
-    if format not in allowed:
+    if format not in OUTPUT_FORMATS:
         raise HTTPException(status_code=400, detail="Invalid format")
 
-    path = EXCLUSION_DATA_DIR / f"{job}.{format}"
-    if not path.exists():
+    rendered = await run_io(result_store.get, job, format)
+    if rendered is None:
         raise HTTPException(status_code=404, detail="File not found")
-
-    media_type = "text/plain; charset=utf-8"
-    headers: dict[str, str] | None = None
-    if format == "json":
-        media_type = "application/json; charset=utf-8"
-    if format == "fxl":
-        # Force download with .fxl extension; some browsers map XML media types to .xml.
-        media_type = "application/octet-stream"
-        headers = {
-            "Content-Disposition": 'attachment; filename="frequencies.fxl"',
-            "X-Content-Type-Options": "nosniff",
-        }
-
-    return FileResponse(
-        path,
-        media_type=media_type,
-        filename=f"frequencies.{format}",
-        headers=headers,
-    )
+    if isinstance(rendered, Path):
+        # large result: served from disk instead of an in-memory, pre-compressed copy
+        spec = OUTPUT_FORMATS[format]
+        return FileResponse(rendered, media_type=spec.media_type, headers=spec.headers)
+    return cached_response(request, rendered)
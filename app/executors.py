@@ -0,0 +1,142 @@
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "8"))
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", str(max(1, min(4, os.cpu_count() or 1)))))
+# Achtergrondjobs van de exclusion builder (vision-calls van tot REQUEST_TIMEOUT)
+JOB_POOL_SIZE = int(os.getenv("JOB_POOL_SIZE", "2"))
+
+class _TrackedPool:
+    """
+    Wrapper rond een concurrent.futures executor die bijhoudt hoeveel taken
+    wachten, lopen en klaar zijn (zichtbaar op /debug).
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Executor], size: int):
+        self.name = name
+        self.size = size
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        with self._lock:
+            self.submitted += 1
+        fut = self.executor.submit(fn, *args, **kwargs)
+        fut.add_done_callback(self._on_done)
+        return fut
+
+    def _on_done(self, fut: Future) -> None:
+        with self._lock:
+            self.completed += 1
+            if not fut.cancelled() and fut.exception() is not None:
+                self.failed += 1
+
+    def _mark_started(self) -> None:
+        with self._lock:
+            self.active += 1
+
+    def _mark_finished(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = self.submitted - self.completed
+            return {
+                "size": self.size,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": in_flight,
+                "active": self.active,
+                "queued": max(0, in_flight - self.active),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            ex, self._executor = self._executor, None
+        if ex is not None:
+            ex.shutdown(wait=True, cancel_futures=True)
+
+def _tracked_call(pool: _TrackedPool, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    pool._mark_started()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        pool._mark_finished()
+
+io_pool = _TrackedPool(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="io"),
+    IO_POOL_SIZE,
+)
+def _cpu_context() -> multiprocessing.context.BaseContext:
+    # Geen fork: een geforkte worker erft de open fd's van leader.lock/update.lock
+    # en houdt de flock vast als de leader crasht (dan neemt niemand nog over).
+    # forkserver/spawn starten workers uit een vers proces zonder die fd's.
+    # Gevolg: een worker importeert het hoofdscript opnieuw; scripts die de pool
+    # gebruiken (bench/) hebben een `if __name__ == "__main__"`-guard nodig.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+cpu_pool = _TrackedPool(
+    "cpu",
+    lambda: ProcessPoolExecutor(max_workers=CPU_POOL_SIZE, mp_context=_cpu_context()),
+    CPU_POOL_SIZE,
+)
+
+job_pool = _TrackedPool(
+    "jobs",
+    lambda: ThreadPoolExecutor(max_workers=JOB_POOL_SIZE, thread_name_prefix="job"),
+    JOB_POOL_SIZE,
+)
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Voert een blokkerende functie (SQLite, bestanden, HTTP) uit in de I/O
+    thread-pool zonder de event loop te blokkeren.
+    """
+    fut = io_pool.submit(_tracked_call, io_pool, fn, *args, **kwargs)
+    return await asyncio.wrap_future(fut)
+
+def submit_cpu(fn: Callable[..., T], *args: Any) -> "Future[T]":
+    """
+    Stuurt CPU-zwaar werk (PDF-parsing) naar de process-pool. `fn` en de
+    argumenten moeten picklebaar zijn.
+    """
+    # taken in een ander proces tellen we niet als "active": queued = in_flight
+    return cpu_pool.submit(fn, *args)
+
+def submit_job(fn: Callable[..., T], *args: Any) -> "Future[T]":
+    """
+    Langlopende achtergrondjob in een eigen, kleine thread-pool, zodat trage
+    jobs de I/O-pool (en dus de gewone requests) niet opeten.
+    """
+    return job_pool.submit(_tracked_call, job_pool, fn, *args)
+
+def executor_stats() -> Dict[str, Dict[str, int]]:
+    return {"io": io_pool.stats(), "cpu": cpu_pool.stats(), "jobs": job_pool.stats()}
+
+def shutdown_executors() -> None:
+    job_pool.shutdown()
+    cpu_pool.shutdown()
+    io_pool.shutdown()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Geldige band (MHz): frequenties erbuiten vallen weg, ranges worden afgeknipt
+BAND_MIN_MHZ = float(os.getenv("BAND_MIN_MHZ", "25"))
+BAND_MAX_MHZ = float(os.getenv("BAND_MAX_MHZ", "3000"))
+# Waarden boven deze grens staan in kHz (zelfde heuristiek als _normalize_value)
+KHZ_THRESHOLD = 3000.0
+
+_NUM = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?"
+# Eén regex-pass over alle strings samen (één per regel) i.p.v. float()/re.split per item
+_VALUE_LINE_RE = re.compile(r"^[ \t]*(" + _NUM + r")[ \t]*$", re.MULTILINE)
+_RANGE_LINE_RE = re.compile(r"^[ \t]*(" + _NUM + r")[ \t]*[-–—][ \t]*(" + _NUM + r")[ \t]*$", re.MULTILINE)
+# Voor paren moeten de posities behouden blijven: onbruikbare regels worden "nan"
+_BAD_VALUE_LINE_RE = re.compile(r"^(?![ \t]*" + _NUM + r"[ \t]*$).*$", re.MULTILINE)
+
+@dataclass
+class Normalized:
+    freqs_khz: np.ndarray  # int64, gesorteerd en uniek
+    ranges_khz: np.ndarray  # int64 (n, 2), gesorteerd en disjunct
+    report: Dict[str, int] = field(default_factory=dict)
+
+    def freqs_mhz(self) -> List[float]:
+        return (self.freqs_khz / 1000.0).tolist()
+
+    def ranges_mhz(self) -> List[List[float]]:
+        return (self.ranges_khz / 1000.0).tolist()
+
+class _NormalizeStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.seconds = 0.0
+        self.counts: Dict[str, int] = {}
+
+    def record(self, report: Dict[str, int], seconds: float) -> None:
+        with self._lock:
+            self.runs += 1
+            self.seconds += seconds
+            for key, value in report.items():
+                self.counts[key] = self.counts.get(key, 0) + value
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out: Dict[str, float] = {"runs": self.runs}
+            out.update(self.counts)
+            out["avg_ms"] = round(self.seconds / self.runs * 1000, 2) if self.runs else 0.0
+            return out
+
+normalize_stats = _NormalizeStats()
+
+def _clean(strings: List[str]) -> str:
+    # alles in één string: lower/replace lopen dan één keer in C over de hele payload
+    text = "\n".join(s.replace("\n", " ") for s in strings).lower()
+    return text.replace("mhz", "").replace("khz", "").replace(",", "")
+
+def parse_values(items: Sequence[Any]) -> Tuple[np.ndarray, int]:
+    """
+    Getallen en strings ("470.125", "470,125 MHz", "470125 kHz") naar een
+    float64-array; geeft ook het aantal onbruikbare items terug. De volgorde
+    blijft niet behouden (het resultaat wordt toch gesorteerd).
+    """
+    if not len(items):
+        return np.empty(0, dtype=np.float64), 0
+    try:
+        # snelle weg: enkel getallen of zuivere getal-strings
+        values = np.array(items, dtype=np.float64)
+        if values.ndim == 1:
+            return values, 0
+    except (TypeError, ValueError):
+        pass
+    numbers = [x for x in items if isinstance(x, (int, float))]
+    strings = [x for x in items if isinstance(x, str)]
+    found = _VALUE_LINE_RE.findall(_clean(strings)) if strings else []
+    values = np.concatenate((np.array(numbers, dtype=np.float64), np.array(found, dtype=np.float64)))
+    return values, len(items) - len(values)
+
+def _parse_aligned(items: Sequence[Any]) -> np.ndarray:
+    # zoals parse_values, maar met NaN op de plaats van onbruikbare items
+    try:
+        return np.array(items, dtype=np.float64).reshape(len(items))
+    except (TypeError, ValueError):
+        pass
+    strings = [repr(float(x)) if isinstance(x, (int, float)) else x if isinstance(x, str) else "" for x in items]
+    return np.array(_BAD_VALUE_LINE_RE.sub("nan", _clean(strings)).split("\n"), dtype=np.float64)
+
+def parse_ranges(items: Sequence[Any]) -> Tuple[np.ndarray, int]:
+    """
+    Paren ([start, end], ook als strings) en strings ("470 - 478 MHz") naar
+    een float64-array (n, 2); geeft ook het aantal onbruikbare items terug.
+    """
+    if not len(items):
+        return np.empty((0, 2), dtype=np.float64), 0
+    try:
+        values = np.array(items, dtype=np.float64)
+        if values.ndim == 2 and values.shape[1] == 2:
+            return values, 0
+    except (TypeError, ValueError):
+        pass
+    pairs = [x for x in items if isinstance(x, (list, tuple)) and len(x) == 2]
+    strings = [x for x in items if isinstance(x, str)]
+    flat = _parse_aligned([v for p in pairs for v in p]).reshape(-1, 2) if pairs else np.empty((0, 2))
+    # een paar met een onbruikbare kant valt volledig weg
+    flat = flat[~np.isnan(flat).any(axis=1)]
+    found = _RANGE_LINE_RE.findall(_clean(strings)) if strings else []
+    values = np.concatenate((flat, np.array(found, dtype=np.float64).reshape(-1, 2)))
+    return values, len(items) - len(values)
+
+def to_khz(values: np.ndarray) -> np.ndarray:
+    """
+    kHz/MHz-heuristiek gevectoriseerd: > KHZ_THRESHOLD is al kHz. Geeft int64 kHz.
+    """
+    mhz = np.where(values > KHZ_THRESHOLD, values / 1000.0, values)
+    return np.rint(mhz * 1000.0).astype(np.int64)
+
+def merge_ranges(ranges_khz: np.ndarray) -> np.ndarray:
+    """
+    Sorteert en voegt overlappende ranges (ook met een gedeeld eindpunt)
+    samen, zoals IntervalSet.
+    """
+    if len(ranges_khz) == 0:
+        return ranges_khz.reshape(0, 2)
+    r = np.sort(ranges_khz, axis=1)
+    r = r[np.lexsort((r[:, 1], r[:, 0]))]
+    starts, ends = r[:, 0], r[:, 1]
+    reach = np.maximum.accumulate(ends)
+    # nieuwe groep waar de start voorbij het verste einde tot dan toe ligt
+    new = np.empty(len(r), dtype=bool)
+    new[0] = True
+    new[1:] = starts[1:] > reach[:-1]
+    idx = np.flatnonzero(new)
+    return np.column_stack((starts[idx], np.maximum.reduceat(ends, idx)))
+
+def normalize_khz(freqs_khz: np.ndarray, ranges_khz: np.ndarray, report: Dict[str, int] | None = None) -> Normalized:
+    """
+    Bandgrenzen, ranges samenvoegen, frequencies ontdubbelen en frequenties
+    die al in een range vallen weglaten.
+    """
+    report = dict(report or {})
+    lo, hi = int(round(BAND_MIN_MHZ * 1000)), int(round(BAND_MAX_MHZ * 1000))
+
+    in_band = (freqs_khz >= lo) & (freqs_khz <= hi)
+    ranges_khz = np.sort(ranges_khz.reshape(-1, 2), axis=1)
+    overlaps = (ranges_khz[:, 1] >= lo) & (ranges_khz[:, 0] <= hi)
+    report["out_of_band"] = report.get("out_of_band", 0) + int((~in_band).sum()) + int((~overlaps).sum())
+    ranges_khz = np.clip(ranges_khz[overlaps], lo, hi)
+
+    merged = merge_ranges(ranges_khz)
+    report["merged_ranges"] = len(ranges_khz) - len(merged)
+
+    kept = freqs_khz[in_band]
+    unique = np.unique(kept)
+    report["duplicates"] = len(kept) - len(unique)
+    if len(merged):
+        pos = np.searchsorted(merged[:, 0], unique, side="right") - 1
+        covered = (pos >= 0) & (unique <= merged[np.maximum(pos, 0), 1])
+        unique = unique[~covered]
+        report["covered"] = int(covered.sum())
+    else:
+        report["covered"] = 0
+    return Normalized(unique, merged, report)
+
+def normalize(freqs: Sequence[Any], ranges: Sequence[Any]) -> Normalized:
+    """
+    Bulknormalisatie van een extractieresultaat: alles parsen in numpy-arrays,
+    kHz/MHz-heuristiek, bandgrenzen, ranges samenvoegen, ontdubbelen en
+    frequenties binnen een range weglaten. `report` telt wat wegviel.
+    """
+    t0 = time.perf_counter()
+    fvals, bad_f = parse_values(freqs)
+    rvals, bad_r = parse_ranges(ranges)
+    finite_f = np.isfinite(fvals)
+    finite_r = np.isfinite(rvals).all(axis=1)
+    report = {"invalid": bad_f + bad_r + int((~finite_f).sum()) + int((~finite_r).sum())}
+    result = normalize_khz(to_khz(fvals[finite_f]), to_khz(rvals[finite_r]), report)
+    normalize_stats.record(result.report, time.perf_counter() - t0)
+    return result
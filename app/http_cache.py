@@ -0,0 +1,166 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import re
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli  # optioneel: pip install brotli
+except ImportError:  # pragma: no cover - afhankelijk van de installatie
+    brotli = None
+
+# Kleinere bodies niet comprimeren: de overhead is groter dan de winst
+MIN_COMPRESS_BYTES = 512
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+@dataclass(frozen=True)
+class CachedBody:
+    """
+    Een volledig voorbereide response-body: sterke ETag, Last-Modified en
+    vooraf gecomprimeerde gzip/brotli-varianten.
+    """
+    body: bytes
+    media_type: str
+    etag: str
+    last_modified: float
+    variants: Dict[str, bytes] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def etag_for(self, encoding: str) -> str:
+        # elke representatie krijgt een eigen sterke ETag
+        return self.etag if encoding == "identity" else self.etag[:-1] + "-" + encoding + '"'
+
+def make_cached_body(
+    body: bytes,
+    media_type: str,
+    last_modified: float,
+    headers: Optional[Dict[str, str]] = None,
+    etag: Optional[str] = None,
+) -> CachedBody:
+    variants: Dict[str, bytes] = {}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) < len(body):
+            variants["gzip"] = gz
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) < len(body):
+                variants["br"] = br
+    return CachedBody(
+        body=body,
+        media_type=media_type,
+        etag=etag or '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+        last_modified=last_modified,
+        variants=variants,
+        headers=dict(headers or {}),
+    )
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+def _choose_encoding(cached: CachedBody, request: Request) -> str:
+    accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    for enc in ("br", "gzip"):
+        if enc in cached.variants and accepted.get(enc, accepted.get("*", 0.0)) > 0:
+            return enc
+    return "identity"
+
+def _not_modified(cached: CachedBody, request: Request) -> bool:
+    inm = request.headers.get("If-None-Match")
+    if inm is not None:
+        if inm.strip() == "*":
+            return True
+        tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        known = {cached.etag_for(enc) for enc in ("identity", *cached.variants)}
+        return bool(tags & known)
+    ims = request.headers.get("If-Modified-Since")
+    if ims:
+        try:
+            return int(cached.last_modified) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Eén byte-range ("bytes=a-b", "bytes=a-", "bytes=-n"). Geeft (start, end)
+    inclusief terug, of None als de range niet te voldoen is.
+    """
+    m = RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    if not m.group(1):
+        n = int(m.group(2))
+        if n == 0:
+            return None
+        return max(0, size - n), size - 1
+    start = int(m.group(1))
+    end = int(m.group(2)) if m.group(2) else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+def cached_response(request: Request, cached: CachedBody) -> Response:
+    """
+    Bouwt de response voor een CachedBody: 304 bij een geldige conditionele
+    request, 206/416 bij een Range-request, anders de beste encoding.
+    """
+    headers = {
+        "Last-Modified": formatdate(cached.last_modified, usegmt=True),
+        "Vary": "Accept-Encoding",
+        **cached.headers,
+    }
+    if _not_modified(cached, request):
+        encoding = _choose_encoding(cached, request)
+        headers["ETag"] = cached.etag_for(encoding)
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and (if_range is None or if_range.strip() == cached.etag):
+        # ranges enkel op de ongecomprimeerde representatie
+        headers["ETag"] = cached.etag
+        headers["Accept-Ranges"] = "bytes"
+        size = len(cached.body)
+        rng = _parse_range(range_header, size)
+        if rng is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        start, end = rng
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(
+            content=cached.body[start : end + 1],
+            status_code=206,
+            headers=headers,
+            media_type=cached.media_type,
+        )
+
+    encoding = _choose_encoding(cached, request)
+    headers["ETag"] = cached.etag_for(encoding)
+    headers["Accept-Ranges"] = "bytes"
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+        body = cached.variants[encoding]
+    else:
+        body = cached.body
+    return Response(content=body, status_code=200, headers=headers, media_type=cached.media_type)
@@ -0,0 +1,302 @@
+from __future__ import annotations
+import base64
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+UA = "Mozilla/5.0 (compatible; BIPT-WWB-Server/1.0; +https://www.bipt.be/)"
+
+# Pogingen na de eerste mislukte request (enkel GET/HEAD, tenzij de caller `retries` meegeeft)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+# Exponentiële backoff met full jitter: random(0, min(MAX, BASE * 2**poging)) seconden
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "10"))
+# Maximum aantal gelijktijdige requests per host
+HTTP_HOST_CONCURRENCY = int(os.getenv("HTTP_HOST_CONCURRENCY", "4"))
+# Circuit breaker: na zoveel opeenvolgende fouten gaat de host HTTP_BREAKER_RESET seconden dicht
+HTTP_BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5"))
+HTTP_BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET", "60"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_METHODS = frozenset({"GET", "HEAD"})
+# Aantal recente requests per host waarover p50/p95 berekend worden
+_TIMING_WINDOW = 200
+
+class CircuitOpenError(RuntimeError):
+    """
+    De circuit breaker voor deze host staat open: er wordt niet eens geprobeerd.
+    """
+
+class _HostState:
+    """
+    Per host: concurrency-slots, circuit breaker en timingmetrics.
+    """
+
+    def __init__(self, concurrency: int):
+        self.slots = threading.BoundedSemaphore(max(1, concurrency))
+        self.lock = threading.Lock()
+        # circuit breaker
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        # metrics
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.recent: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+        self.last_status: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    def state(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if now - self.opened_at >= HTTP_BREAKER_RESET:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self.lock:
+            st = self.state(time.monotonic())
+            if st == "closed":
+                return True
+            if st == "half-open" and not self.probing:
+                # één proefrequest; slaagt die, dan gaat de breaker weer dicht
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, elapsed: float, status: Optional[int], error: Optional[str]) -> None:
+        failed = error is not None or (status is not None and status in RETRY_STATUSES)
+        with self.lock:
+            self.requests += 1
+            self.total_s += elapsed
+            self.max_s = max(self.max_s, elapsed)
+            self.recent.append(elapsed)
+            self.last_status = status
+            self.probing = False
+            if failed:
+                self.failures += 1
+                self.last_error = error or f"HTTP {status}"
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= HTTP_BREAKER_THRESHOLD or self.opened_at is not None:
+                    # (her)openen, ook als de proefrequest mislukt
+                    self.opened_at = time.monotonic()
+            else:
+                self.consecutive_failures = 0
+                self.opened_at = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            recent = sorted(self.recent)
+            return {
+                "state": self.state(time.monotonic()),
+                "requests": self.requests,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_s / self.requests * 1000, 1) if self.requests else None,
+                "p50_ms": _percentile_ms(recent, 0.50),
+                "p95_ms": _percentile_ms(recent, 0.95),
+                "max_ms": round(self.max_s * 1000, 1),
+                "last_status": self.last_status,
+                "last_error": self.last_error,
+            }
+
+class Base64Body:
+    """
+    Request-body `prefix + base64(bron) + suffix` die tijdens het versturen
+    in stukjes gelezen wordt: de bron (bytes of een bestand) staat nooit
+    base64-gecodeerd in geheugen. Heeft een vaste lengte (Content-Length)
+    en kan teruggespoeld worden voor een retry.
+    """
+
+    # veelvoud van 3, zodat elk stuk zonder padding gecodeerd wordt
+    CHUNK = 3 * 64 * 1024
+
+    def __init__(self, prefix: bytes, source: Union[bytes, Path], suffix: bytes):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.source = source
+        size = len(source) if isinstance(source, bytes) else source.stat().st_size
+        self._length = len(prefix) + 4 * ((size + 2) // 3) + len(suffix)
+        self._pos = 0
+        self._buf = b""
+        self._off = 0
+        self._parts: Iterator[bytes] = iter(())
+        self.seek(0)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _iter(self) -> Iterator[bytes]:
+        yield self.prefix
+        if isinstance(self.source, bytes):
+            view = memoryview(self.source)
+            for i in range(0, len(view), self.CHUNK):
+                yield base64.b64encode(view[i:i + self.CHUNK])
+        else:
+            with open(self.source, "rb") as fh:
+                while True:
+                    chunk = fh.read(self.CHUNK)
+                    if not chunk:
+                        break
+                    yield base64.b64encode(chunk)
+        yield self.suffix
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if offset != 0 or whence not in (0, 2):
+            raise ValueError("Base64Body kan enkel naar het begin of einde springen")
+        self.close()
+        if whence == 2:
+            self._parts, self._pos = iter(()), self._length
+        else:
+            self._parts, self._pos = self._iter(), 0
+        self._buf, self._off = b"", 0
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        out = []
+        while size != 0:
+            if self._off >= len(self._buf):
+                part = next(self._parts, None)
+                if part is None:
+                    break
+                self._buf, self._off = part, 0
+            end = len(self._buf) if size < 0 else min(len(self._buf), self._off + size)
+            out.append(self._buf[self._off:end])
+            if size > 0:
+                size -= end - self._off
+            self._off = end
+        data = b"".join(out)
+        self._pos += len(data)
+        return data
+
+    def close(self) -> None:
+        close = getattr(self._parts, "close", None)
+        if close is not None:
+            close()
+
+def _percentile_ms(ordered: list, p: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+class HttpClient:
+    """
+    Gedeelde HTTP-client voor BIPT en de OpenAI-API: één keep-alive
+    requests.Session (connection pooling), retries met backoff en jitter,
+    een concurrency-limiet en circuit breaker per host, en timings per host.
+
+    requests spreekt enkel HTTP/1.1; de winst zit in het hergebruik van
+    TCP/TLS-verbindingen.
+    """
+
+    def __init__(self, host_concurrency: int = HTTP_HOST_CONCURRENCY):
+        self.host_concurrency = host_concurrency
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostState] = {}
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max(1, host_concurrency), max_retries=0)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        s.headers["User-Agent"] = UA
+        self.session = s
+
+    def _host(self, url: str) -> _HostState:
+        host = urlsplit(url).netloc
+        st = self._hosts.get(host)
+        if st is None:
+            with self._lock:
+                st = self._hosts.setdefault(host, _HostState(self.host_concurrency))
+        return st
+
+    def _backoff(self, attempt: int, resp: Optional[requests.Response]) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), HTTP_BACKOFF_MAX)
+        return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+    def _send(self, host: _HostState, method: str, url: str, retries: Optional[int], kwargs: Dict[str, Any]) -> requests.Response:
+        # caller houdt een slot van `host` vast
+        if retries is None:
+            retries = HTTP_RETRIES if method.upper() in RETRY_METHODS else 0
+        attempt = 0
+        while True:
+            if not host.allow():
+                raise CircuitOpenError(f"circuit open voor {urlsplit(url).netloc}: {host.last_error}")
+            body = kwargs.get("data")
+            if attempt and hasattr(body, "seek"):
+                # gestreamde body (bv. Base64Body) terugspoelen voor de nieuwe poging
+                body.seek(0)
+            t0 = time.perf_counter()
+            resp: Optional[requests.Response] = None
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                host.record(time.perf_counter() - t0, None, type(exc).__name__)
+                if not isinstance(exc, (requests.ConnectionError, requests.Timeout)) or attempt >= retries:
+                    raise
+            else:
+                host.record(time.perf_counter() - t0, resp.status_code, None)
+                if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return resp
+                resp.close()
+            delay = self._backoff(attempt, resp)
+            attempt += 1
+            with host.lock:
+                host.retries += 1
+            time.sleep(delay)
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs: Any) -> requests.Response:
+        """
+        Zoals requests.Session.request. Na de laatste poging wordt de laatste
+        response teruggegeven (ook bij 5xx) of de laatste exceptie opnieuw
+        opgegooid; een open circuit geeft CircuitOpenError.
+        """
+        host = self._host(url)
+        with host.slots:
+            return self._send(host, method, url, retries, kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, retries: Optional[int] = None, **kwargs: Any) -> Iterator[requests.Response]:
+        """
+        Streaming request: het host-slot blijft bezet tot de body gelezen en
+        de response gesloten is.
+        """
+        host = self._host(url)
+        with host.slots:
+            resp = self._send(host, method, url, retries, dict(kwargs, stream=True))
+            try:
+                yield resp
+            finally:
+                resp.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {name: st.snapshot() for name, st in sorted(hosts.items())}
+
+http_client = HttpClient()
@@ -0,0 +1,216 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no")
+
+# Lange zijde na verkleinen (de vision-API schaalt zelf ook naar max. 2048)
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "2048"))
+# Doelgrootte van de geëncodeerde afbeelding (vóór base64)
+IMAGE_TARGET_BYTES = int(os.getenv("IMAGE_TARGET_BYTES", str(600 * 1024)))
+# "jpeg" of "webp" (valt terug op jpeg als Pillow geen WebP heeft)
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "jpeg").strip().lower()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+IMAGE_MIN_QUALITY = int(os.getenv("IMAGE_MIN_QUALITY", "50"))
+# Voor tekstdocumenten: grijswaarden en autocontrast
+IMAGE_GRAYSCALE = _flag("IMAGE_GRAYSCALE", "0")
+IMAGE_AUTOCONTRAST = _flag("IMAGE_AUTOCONTRAST", "0")
+# Egale randen (papier, schermranden) automatisch wegsnijden
+IMAGE_AUTOCROP = _flag("IMAGE_AUTOCROP", "0")
+
+# Hoe vaak verder verkleind wordt als zelfs IMAGE_MIN_QUALITY boven het doel blijft
+_MAX_DOWNSCALE_STEPS = 3
+
+Crop = Tuple[float, float, float, float]
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    bytes_in: int
+    seconds: float
+
+class _PrepStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.images = 0
+        self.passthrough = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def record(self, prepared: PreparedImage, passthrough: bool) -> None:
+        with self._lock:
+            self.images += 1
+            self.passthrough += int(passthrough)
+            self.bytes_in += prepared.bytes_in
+            self.bytes_out += len(prepared.data)
+            self.seconds += prepared.seconds
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "images": self.images,
+                "passthrough": self.passthrough,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "avg_ms": round(self.seconds / self.images * 1000, 1) if self.images else 0.0,
+            }
+
+prep_stats = _PrepStats()
+
+def parse_crop(value: str) -> Optional[Crop]:
+    """
+    "x0,y0,x1,y1" als fracties (0..1) van breedte en hoogte; leeg = geen crop.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("crop needs four values: x0,y0,x1,y1")
+    x0, y0, x1, y1 = parts
+    if not (0.0 <= x0 < x1 <= 1.0 and 0.0 <= y0 < y1 <= 1.0):
+        raise ValueError("crop values must be fractions with x0 < x1 and y0 < y1")
+    return x0, y0, x1, y1
+
+def _output_format() -> Tuple[str, str]:
+    if IMAGE_FORMAT == "webp":
+        from PIL import features
+
+        if features.check("webp"):
+            return "WEBP", "image/webp"
+    return "JPEG", "image/jpeg"
+
+def _encode(img, fmt: str, quality: int) -> bytes:
+    out = BytesIO()
+    if fmt == "WEBP":
+        img.save(out, format="WEBP", quality=quality, method=4)
+    else:
+        img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+def _encode_to_target(img, fmt: str) -> bytes:
+    """
+    Hoogste kwaliteit tussen IMAGE_MIN_QUALITY en IMAGE_QUALITY die onder
+    IMAGE_TARGET_BYTES blijft (binair zoeken); lukt dat niet, dan verder
+    verkleinen.
+    """
+    from PIL import Image
+
+    for _ in range(_MAX_DOWNSCALE_STEPS + 1):
+        data = _encode(img, fmt, IMAGE_QUALITY)
+        if len(data) <= IMAGE_TARGET_BYTES:
+            return data
+        lo, hi, best = IMAGE_MIN_QUALITY, IMAGE_QUALITY - 1, None
+        while lo <= hi:
+            q = (lo + hi) // 2
+            candidate = _encode(img, fmt, q)
+            if len(candidate) <= IMAGE_TARGET_BYTES:
+                best, lo = candidate, q + 1
+            else:
+                hi = q - 1
+        if best is not None:
+            return best
+        img = img.resize((max(1, img.width * 3 // 4), max(1, img.height * 3 // 4)), Image.Resampling.LANCZOS)
+    return _encode(img, fmt, IMAGE_MIN_QUALITY)
+
+def _autocrop(img):
+    from PIL import Image, ImageChops
+
+    gray = img.convert("L")
+    # achtergrond = de kleur van de hoekpixel, kleine afwijkingen (ruis) negeren
+    bg = Image.new("L", gray.size, gray.getpixel((0, 0)))
+    bbox = ImageChops.difference(gray, bg).point(lambda v: 255 if v > 24 else 0).getbbox()
+    if bbox is None:
+        return img
+    pad = max(4, max(img.size) // 100)
+    x0, y0, x1, y1 = bbox
+    return img.crop((max(0, x0 - pad), max(0, y0 - pad), min(img.width, x1 + pad), min(img.height, y1 + pad)))
+
+def prepare_image(
+    image: bytes | Path,
+    mime_type: str | None,
+    filename: str | None = None,
+    crop: Optional[Crop] = None,
+) -> PreparedImage:
+    """
+    Maakt een upload klaar voor de vision-call: EXIF-oriëntatie, optionele
+    crop, verkleinen tot IMAGE_MAX_EDGE, optioneel grijswaarden/autocontrast
+    en encoderen (JPEG of WebP) onder IMAGE_TARGET_BYTES.
+
+    Een JPEG/WebP die al klein genoeg is en geen bewerking nodig heeft, gaat
+    ongewijzigd door (geen extra generatieverlies).
+
+    `image` mag ook een pad zijn (gespoolde upload): Pillow leest dan enkel
+    wat het nodig heeft van schijf in plaats van het hele bestand in geheugen.
+    """
+    t0 = time.perf_counter()
+    try:
+        from PIL import Image, ImageOps
+    except Exception as exc:
+        raise RuntimeError(
+            "Image conversion requires Pillow. Add pillow to requirements."
+        ) from exc
+
+    size_in = len(image) if isinstance(image, bytes) else image.stat().st_size
+    try:
+        img = Image.open(BytesIO(image) if isinstance(image, bytes) else image)
+        src_format = img.format
+        # JPEG: direct op (ongeveer) de doelresolutie decoderen, veel sneller voor 12MP+
+        if crop is None and not IMAGE_AUTOCROP and max(img.size) > IMAGE_MAX_EDGE:
+            scale = IMAGE_MAX_EDGE / max(img.size)
+            img.draft("RGB", (int(img.width * scale), int(img.height * scale)))
+        orientation = img.getexif().get(0x0112, 1)
+
+        fmt, out_mime = _output_format()
+        if (
+            src_format == fmt
+            and orientation == 1
+            and crop is None
+            and not (IMAGE_AUTOCROP or IMAGE_GRAYSCALE or IMAGE_AUTOCONTRAST)
+            and max(img.size) <= IMAGE_MAX_EDGE
+            and size_in <= IMAGE_TARGET_BYTES
+        ):
+            data = image if isinstance(image, bytes) else image.read_bytes()
+            prepared = PreparedImage(data, out_mime, img.width, img.height, size_in, time.perf_counter() - t0)
+            prep_stats.record(prepared, passthrough=True)
+            return prepared
+
+        img = ImageOps.exif_transpose(img)
+        if crop is not None:
+            x0, y0, x1, y1 = crop
+            img = img.crop((
+                int(x0 * img.width), int(y0 * img.height),
+                max(int(x0 * img.width) + 1, int(x1 * img.width)),
+                max(int(y0 * img.height) + 1, int(y1 * img.height)),
+            ))
+        if IMAGE_AUTOCROP:
+            img = _autocrop(img)
+        if IMAGE_GRAYSCALE:
+            img = img.convert("L")
+        elif img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        if max(img.size) > IMAGE_MAX_EDGE:
+            img.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.Resampling.LANCZOS)
+        if IMAGE_AUTOCONTRAST:
+            img = ImageOps.autocontrast(img, cutoff=1)
+
+        data = _encode_to_target(img, fmt)
+    except Exception as exc:
+        raise RuntimeError(
+            "Failed to convert image. For HEIC/HEIF or DNG, install extra codecs."
+        ) from exc
+
+    prepared = PreparedImage(data, out_mime, img.width, img.height, size_in, time.perf_counter() - t0)
+    prep_stats.record(prepared, passthrough=False)
+    return prepared
@@ -0,0 +1,129 @@
+from __future__ import annotations
+from array import array
+from itertools import chain
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+class IntervalSet:
+    """
+    Gesorteerde, disjuncte verzameling gesloten integer-intervallen [start, end]
+    (frequenties in kHz), opgeslagen als twee parallelle array('q')'s: 16 bytes
+    per range in plaats van een Python-object per range.
+
+    Intervallen die overlappen of een eindpunt delen worden samengevoegd
+    (zelfde regel als de oude `_merge_ranges`). Unie gebruikt Timsort op de
+    aaneengeschakelde gesorteerde runs (lineair voor twee sets, O(n log k)
+    voor k sets); doorsnede en complement zijn één lineaire merge.
+    """
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, starts: "array[int] | None" = None, ends: "array[int] | None" = None):
+        # enkel voor intern gebruik: starts/ends moeten al genormaliseerd zijn
+        self._starts = starts if starts is not None else array("q")
+        self._ends = ends if ends is not None else array("q")
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Sequence[int]], presorted: bool = False) -> "IntervalSet":
+        """
+        Bouwt een set uit (start, end)-paren; start > end wordt omgedraaid.
+        Met `presorted=True` wordt de sortering overgeslagen (O(n)).
+        """
+        norm = ((s, e) if s <= e else (e, s) for s, e in ((int(p[0]), int(p[1])) for p in pairs))
+        return cls._merged(norm if presorted else sorted(norm))
+
+    @classmethod
+    def _merged(cls, pairs: Iterable[Tuple[int, int]]) -> "IntervalSet":
+        starts = array("q")
+        ends = array("q")
+        it = iter(pairs)
+        first = next(it, None)
+        if first is None:
+            return cls(starts, ends)
+        cur_s, cur_e = first
+        for s, e in it:
+            if s <= cur_e:
+                if e > cur_e:
+                    cur_e = e
+            else:
+                starts.append(cur_s)
+                ends.append(cur_e)
+                cur_s, cur_e = s, e
+        starts.append(cur_s)
+        ends.append(cur_e)
+        return cls(starts, ends)
+
+    @classmethod
+    def union_all(cls, sets: Iterable["IntervalSet"]) -> "IntervalSet":
+        """
+        Unie van veel sets in één keer, i.p.v. herhaald samenvoegen per zone.
+        """
+        return cls._merged(sorted(chain.from_iterable(sets)))
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self._starts, self._ends)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __bool__(self) -> bool:
+        return len(self._starts) > 0
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __repr__(self) -> str:
+        return f"IntervalSet({self.to_pairs()!r})"
+
+    def to_pairs(self) -> List[Tuple[int, int]]:
+        return list(self)
+
+    def nbytes(self) -> int:
+        return (len(self._starts) + len(self._ends)) * self._starts.itemsize
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet._merged(sorted(chain(self, other)))
+
+    def intersection(self, other: "IntervalSet") -> "IntervalSet":
+        a_s, a_e, b_s, b_e = self._starts, self._ends, other._starts, other._ends
+        starts = array("q")
+        ends = array("q")
+        i = j = 0
+        while i < len(a_s) and j < len(b_s):
+            lo = max(a_s[i], b_s[j])
+            hi = min(a_e[i], b_e[j])
+            if lo <= hi:
+                starts.append(lo)
+                ends.append(hi)
+            if a_e[i] < b_e[j]:
+                i += 1
+            else:
+                j += 1
+        return IntervalSet(starts, ends)
+
+    def complement(self, lo: int, hi: int) -> "IntervalSet":
+        """
+        Alle waarden in [lo, hi] die niet in de set zitten.
+        """
+        starts = array("q")
+        ends = array("q")
+        cur = lo
+        for s, e in self:
+            if e < lo:
+                continue
+            if s > hi:
+                break
+            if s > cur:
+                starts.append(cur)
+                ends.append(s - 1)
+            cur = max(cur, e + 1)
+        if cur <= hi:
+            starts.append(cur)
+            ends.append(hi)
+        return IntervalSet(starts, ends)
+
+    def difference(self, other: "IntervalSet") -> "IntervalSet":
+        if not self or not other:
+            return IntervalSet(array("q", self._starts), array("q", self._ends))
+        return self.intersection(other.complement(self._starts[0], self._ends[-1]))
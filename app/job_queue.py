@@ -0,0 +1,205 @@
+from __future__ import annotations
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .artifacts import atomic_write
+from .executors import JOB_POOL_SIZE, submit_job
+
+# Maximum aantal jobs dat tegelijk wacht of loopt; daarboven: QueueFullError (503)
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "32"))
+# Afgeronde jobs worden na zoveel seconden vergeten
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+TERMINAL = frozenset({"done", "error"})
+
+class QueueFullError(RuntimeError):
+    pass
+
+class Job:
+    """
+    Eén achtergrondjob. `stage` is vrije tekst voor de voortgang
+    (bv. "converting", "extracting"); `version` stijgt bij elke wijziging
+    zodat status- en SSE-clients weten of er iets nieuws is.
+    """
+
+    __slots__ = ("id", "status", "stage", "created_at", "started_at", "finished_at", "error", "result", "version")
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = "queued"
+        self.stage = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.version = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "result": self.result,
+            "version": self.version,
+        }
+
+class JobQueue:
+    """
+    Begrensde queue van achtergrondjobs bovenop de job-pool (executors).
+
+    De status leeft in geheugen en wordt bij elke overgang ook atomisch naar
+    `state_dir/<id>.json` geschreven, zodat een andere uvicorn-worker de
+    status (en het resultaat) kan tonen. Wachtende SSE-clients in dit proces
+    worden via hun event loop gewekt; voor jobs van een andere worker
+    pollen ze het statusbestand.
+    """
+
+    def __init__(self, state_dir: Path, max_pending: int = JOB_QUEUE_MAX, ttl: int = JOB_TTL_SECONDS):
+        self.state_dir = state_dir
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self.rejected = 0
+
+    def _path(self, job_id: str) -> Path:
+        return self.state_dir / f"{job_id}.json"
+
+    def _pending(self) -> int:
+        # caller holds self._lock
+        return sum(1 for j in self._jobs.values() if j.status not in TERMINAL)
+
+    def submit(self, fn: Callable[[Job], Dict[str, Any]]) -> Job:
+        """
+        Plant `fn(job)` in; de return value wordt `job.result`. `fn` mag
+        tussendoor `queue.update(job, stage=...)` aanroepen.
+        """
+        self.prune()
+        with self._lock:
+            if self._pending() >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"te veel jobs in de wachtrij ({self.max_pending})")
+            job = Job(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+        self._persist(job)
+        submit_job(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Dict[str, Any]]) -> None:
+        self.update(job, status="running", stage="running", started_at=time.time())
+        try:
+            result = fn(job)
+        except Exception as exc:
+            self.update(job, status="error", stage="error", error=str(exc), finished_at=time.time())
+        else:
+            self.update(job, status="done", stage="done", result=result, finished_at=time.time())
+
+    def update(self, job: Job, **fields: Any) -> None:
+        with self._lock:
+            for key, value in fields.items():
+                setattr(job, key, value)
+            job.version += 1
+            waiters = self._waiters.pop(job.id, [])
+        self._persist(job)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _persist(self, job: Job) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = json.dumps(job.snapshot())
+        atomic_write(self._path(job.id), data.encode("utf-8"))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.snapshot()
+        try:
+            return json.loads(self._path(job_id).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    async def wait(self, job_id: str, version: int, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """
+        Wacht tot de job een nieuwere versie dan `version` heeft (of tot
+        `timeout`) en geeft de actuele status terug.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None and job.version <= version:
+                    waiter = (asyncio.get_running_loop(), asyncio.Event())
+                    self._waiters.setdefault(job_id, []).append(waiter)
+                else:
+                    waiter = None
+            remaining = deadline - time.monotonic()
+            if waiter is not None:
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    # bij timeout of een weggevallen client blijft de waiter anders hangen
+                    self._discard_waiter(job_id, waiter)
+                return self.get(job_id)
+            snap = self.get(job_id)
+            if snap is None or snap["version"] > version or snap["status"] in TERMINAL or remaining <= 0:
+                return snap
+            # job van een andere worker: statusbestand pollen
+            await asyncio.sleep(min(0.5, remaining))
+
+    def _discard_waiter(self, job_id: str, waiter: Tuple[asyncio.AbstractEventLoop, asyncio.Event]) -> None:
+        with self._lock:
+            waiters = self._waiters.get(job_id)
+            if waiters is None:
+                return  # al gewekt door update()
+            try:
+                waiters.remove(waiter)
+            except ValueError:
+                pass
+            if not waiters:
+                del self._waiters[job_id]
+
+    def prune(self) -> None:
+        """
+        Vergeet afgeronde jobs ouder dan de TTL (geheugen en statusbestand).
+        """
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [j.id for j in self._jobs.values() if j.status in TERMINAL and (j.finished_at or 0) < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        try:
+            paths = list(self.state_dir.glob("*.json"))
+        except OSError:
+            return
+        for p in paths:
+            try:
+                if p.stat().st_mtime < cutoff:
+                    p.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {"queued": 0, "running": 0, "done": 0, "error": 0}
+            for j in self._jobs.values():
+                counts[j.status] += 1
+            counts["rejected"] = self.rejected
+            counts["workers"] = JOB_POOL_SIZE
+            counts["waiters"] = sum(len(w) for w in self._waiters.values())
+            return counts
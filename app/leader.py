@@ -0,0 +1,68 @@
+from __future__ import annotations
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - niet-POSIX (lokale ontwikkeling)
+    fcntl = None
+
+DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
+
+class FileLock:
+    """
+    Exclusieve flock(2)-lock op een bestand in DATA_DIR, gedeeld tussen alle
+    uvicorn-workers op dezelfde host. De lock verdwijnt automatisch als het
+    proces stopt (ook bij een crash), zodat een andere worker kan overnemen.
+    Daarom mag geen kindproces de fd erven: de CPU-pool forkt niet (zie
+    executors._cpu_context).
+
+    Binnen één proces sluit een threading.Lock de threads onderling uit.
+    Zonder fcntl (niet-POSIX) geldt enkel die: er is dan maar één proces.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._mutex = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = False) -> bool:
+        if not self._mutex.acquire(blocking):
+            return False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            self._mutex.release()
+            raise
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except OSError:
+                os.close(fd)
+                self._mutex.release()
+                return False
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode("ascii"))
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+        self._mutex.release()
+
+# Eén worker is leader: die doet de boot-check en de nightly job
+leader_lock = FileLock(DATA_DIR / "leader.lock")
+# Wie ook een update draait (nightly of /debug/run-check), nooit twee tegelijk
+update_lock = FileLock(DATA_DIR / "update.lock")
@@ -1,15 +1,28 @@
 from __future__ import annotations
 import os
+import asyncio
 import base64
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-
-from .storage import init_db, inc_counter, inc_download, get_stats, mark_unique
-from .bipt_wwb import nightly_check_and_update, list_available_files
-from .exclusion_builder import router as exclusion_builder_router
+from apscheduler.triggers.interval import IntervalTrigger
+
+from .storage import init_db, close_db, get_stats
+from .stats_buffer import stats_buffer
+from .executors import run_io, executor_stats, shutdown_executors
+from .artifacts import artifact_store
+from .pdf_cache import pdf_cache
+from .http_cache import cached_response
+from .http_client import http_client
+from .freq_normalize import normalize_stats
+from .image_prep import prep_stats
+from .page_cache import page_cache
+from .leader import leader_lock, update_lock
+from .bipt_wwb import nightly_check_and_update, list_available_files, zone_status
+from .exclusion_builder import BATCH_MAX_BYTES, job_queue, result_store, router as exclusion_builder_router, vision_cache
+from .uploads import UPLOAD_MAX_BYTES, UploadLimitMiddleware
 
 from pathlib import Path
 
@@ -19,11 +32,21 @@ CHECK_HOUR = int(os.getenv("CHECK_HOUR", "2"))
 CHECK_MINUTE = int(os.getenv("CHECK_MINUTE", "15"))
 LANG = os.getenv("LANG_CODE", "NL")
 LIST_NAME = os.getenv("LIST_NAME", "Belgium (BIPT zones)")
+# Hoe vaak niet-leader workers checken op nieuwe bestanden / een vrije leader-lock
+LEADER_POLL_SECONDS = int(os.getenv("LEADER_POLL_SECONDS", "15"))
 
 DATA_DIR = os.getenv("DATA_DIR", "./data")
 
 app = FastAPI(title="WWB Tools")
 app.include_router(exclusion_builder_router)
+# Te grote uploads weigeren vóór ze (volledig) ingelezen worden
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/exclusion-builder/process": UPLOAD_MAX_BYTES,
+        "/exclusion-builder/batch": BATCH_MAX_BYTES,
+    },
+)
 
 BASE_DIR = Path(__file__).resolve().parent  # .../app
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
@@ -37,69 +60,157 @@ def _check_basic_auth(req: Request) -> None:
     if user != DEBUG_USER or pwd != DEBUG_PASS:
         raise HTTPException(status_code=401, headers={"WWW-Authenticate": "Basic"})
 
-@app.on_event("startup")
-async def startup():
-    init_db()
+_background_tasks: set = set()
+
+def _locked_check() -> bool:
+    # nooit twee updates tegelijk, ook niet over workers heen
+    update_lock.acquire(blocking=True)
+    try:
+        return nightly_check_and_update(lang=LANG, list_name=LIST_NAME)
+    finally:
+        update_lock.release()
+
+async def _run_check() -> bool:
+    # BIPT-download en PDF-parsing lopen buiten de event loop
+    return await run_io(_locked_check)
 
-    # Run once on boot (so you have a file immediately if possible)
+async def _boot_check() -> None:
     try:
-        nightly_check_and_update(lang=LANG, list_name=LIST_NAME)
+        await _run_check()
     except Exception:
-        # we don't want the app to fail booting because BIPT is temporarily down
+        # we don't want the app to fail because BIPT is temporarily down
         pass
 
+async def _scheduled_check() -> None:
+    if leader_lock.held:
+        await _run_check()
+
+async def _follow_leader() -> None:
+    # leader weggevallen? dan neemt deze worker over
+    if not leader_lock.held:
+        await run_io(leader_lock.acquire)
+    # bestanden door een andere worker vernieuwd? herladen
+    await run_io(artifact_store.check_notice)
+
+async def _gc_results() -> None:
+    # vervallen exclusion-builder-resultaten opruimen (elke worker mag dit)
+    await run_io(result_store.gc)
+
+@app.on_event("startup")
+async def startup():
+    init_db()
+    stats_buffer.start()
+    await run_io(artifact_store.refresh)
+
+    # Only the leader runs the boot check, in the background so startup doesn't wait on BIPT
+    if await run_io(leader_lock.acquire):
+        task = asyncio.create_task(_boot_check())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
     scheduler = AsyncIOScheduler(timezone=os.getenv("TZ", "Europe/Brussels"))
     scheduler.add_job(
-        func=lambda: nightly_check_and_update(lang=LANG, list_name=LIST_NAME),
+        func=_scheduled_check,
         trigger=CronTrigger(hour=CHECK_HOUR, minute=CHECK_MINUTE),
         id="nightly_bipt_check",
         replace_existing=True,
     )
+    scheduler.add_job(
+        func=_follow_leader,
+        trigger=IntervalTrigger(seconds=LEADER_POLL_SECONDS),
+        id="follow_leader",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        func=_gc_results,
+        trigger=IntervalTrigger(hours=1),
+        id="gc_results",
+        replace_existing=True,
+    )
     scheduler.start()
 
+@app.on_event("shutdown")
+async def shutdown():
+    # Laatste flush van gebufferde stats
+    stats_buffer.stop()
+    close_db()
+    shutdown_executors()
+    leader_lock.release()
+
 @app.middleware("http")
 async def count_visits(request: Request, call_next):
     # Count only "human" pages (skip static download responses below)
     path = request.url.path
     if path in {"/", "/debug", "/exclusion-builder/"}:
-        inc_counter("pageviews", 1)
+        stats_buffer.inc_counter("pageviews", 1)
         # Unique visitors (hash of ip+ua) - no raw IP stored
         ip = request.client.host if request.client else "unknown"
         ua = request.headers.get("User-Agent", "")
-        mark_unique(f"{ip}|{ua}")
+        stats_buffer.mark_unique(f"{ip}|{ua}")
 
     return await call_next(request)
 
+def _render_index() -> str:
+    return templates.get_template("index.html").render(files=list_available_files())
+
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    files = list_available_files()
-    return templates.TemplateResponse("index.html", {"request": request, "files": files})
+    # enkel opnieuw renderen als de catalogus (na een BIPT-update) veranderd is
+    page = page_cache.get("index", artifact_store.version, _render_index)
+    return cached_response(request, page)
+
+@app.get("/catalogue.json")
+async def catalogue(request: Request):
+    return cached_response(request, artifact_store.catalogue_body())
 
 @app.get("/download/{filename}")
-async def download(filename: str):
+async def download(filename: str, request: Request):
     # basic safe path check
     if "/" in filename or ".." in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
 
-    path = os.path.join(DATA_DIR, filename)
-    if not os.path.exists(path):
+    artifact = artifact_store.get(filename)
+    if artifact is None:
         raise HTTPException(status_code=404, detail="File not found")
 
-    inc_download(filename, 1)
-    return FileResponse(path, media_type="application/octet-stream", filename=filename)
+    response = cached_response(request, artifact)
+    # enkel volledige downloads tellen: hervatte of opgesplitste Range-requests
+    # niet per stuk, 304/416 helemaal niet
+    if response.status_code == 200 or (
+        response.status_code == 206 and response.headers.get("content-range", "").startswith("bytes 0-")
+    ):
+        stats_buffer.inc_download(filename, 1)
+    return response
 
 @app.get("/debug", response_class=HTMLResponse)
 async def debug(request: Request):
     _check_basic_auth(request)
-    stats = get_stats()
+    await run_io(stats_buffer.flush)
+    stats = await run_io(get_stats)
     files = list_available_files()
+    zones = await run_io(zone_status)
     return templates.TemplateResponse(
         "debug.html",
-        {"request": request, "stats": stats, "files": files},
+        {
+            "request": request,
+            "stats": stats,
+            "files": files,
+            "executors": executor_stats(),
+            "jobs": job_queue.stats(),
+            "http": http_client.stats(),
+            "caches": {
+                "pdf": {"hits": pdf_cache.hits, "misses": pdf_cache.misses},
+                "vision": vision_cache.stats(),
+                "results": result_store.stats(),
+            },
+            "zones": zones,
+            "image_prep": prep_stats.stats(),
+            "normalize": normalize_stats.stats(),
+        },
     )
 
 @app.post("/debug/run-check")
 async def run_check(request: Request):
     _check_basic_auth(request)
-    nightly_check_and_update(lang=LANG, list_name=LIST_NAME)
+    await _run_check()
     return RedirectResponse(url="/debug", status_code=303)
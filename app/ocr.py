@@ -0,0 +1,88 @@
+from __future__ import annotations
+import csv
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+# Tesseract-binary (moet op het systeem staan, bv. apt install tesseract-ocr)
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# Page segmentation mode 6 = één blok tekst (lijsten, tabellen)
+OCR_PSM = os.getenv("OCR_PSM", "6")
+OCR_TIMEOUT = int(os.getenv("OCR_TIMEOUT", "60"))
+
+# Kleinere beelden worden vergroot: Tesseract leest het best bij ~30 px letterhoogte
+_MIN_EDGE = 2000
+_MAX_UPSCALE = 3
+
+Word = Tuple[str, float]  # (tekst, confidence 0..100)
+
+@dataclass
+class OcrResult:
+    lines: List[List[Word]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def text(self) -> str:
+        return "\n".join(" ".join(w for w, _ in line) for line in self.lines)
+
+def tesseract_available() -> bool:
+    return shutil.which(TESSERACT_CMD) is not None
+
+def _prepare(image: Union[bytes, Path]) -> bytes:
+    from PIL import Image, ImageOps
+
+    img = ImageOps.exif_transpose(Image.open(BytesIO(image) if isinstance(image, bytes) else image))
+    img = ImageOps.autocontrast(img.convert("L"), cutoff=1)
+    edge = max(img.size)
+    if edge < _MIN_EDGE:
+        factor = min(_MAX_UPSCALE, _MIN_EDGE / edge)
+        img = img.resize((round(img.width * factor), round(img.height * factor)), Image.Resampling.LANCZOS)
+    out = BytesIO()
+    img.save(out, format="PNG", compress_level=1)
+    return out.getvalue()
+
+def _parse_tsv(tsv: str) -> List[List[Word]]:
+    lines: List[List[Word]] = []
+    current: Optional[Tuple[str, str, str]] = None
+    for row in csv.DictReader(tsv.splitlines(), delimiter="\t", quoting=csv.QUOTE_NONE):
+        text = (row.get("text") or "").strip()
+        if row.get("level") != "5" or not text:
+            continue
+        key = (row["block_num"], row["par_num"], row["line_num"])
+        if key != current:
+            lines.append([])
+            current = key
+        try:
+            conf = max(0.0, float(row["conf"]))
+        except (TypeError, ValueError):
+            conf = 0.0
+        lines[-1].append((text, conf))
+    return lines
+
+def run_ocr(image: Union[bytes, Path]) -> OcrResult:
+    """
+    OCR van één afbeelding met Tesseract (TSV-uitvoer): per regel de woorden
+    met hun confidence. Draait in de process-pool (zie executors.submit_cpu):
+    grijswaarden, autocontrast en vergroten zijn CPU-werk.
+    """
+    t0 = time.perf_counter()
+    if not tesseract_available():
+        raise RuntimeError("Local OCR requires the tesseract binary (TESSERACT_CMD)")
+    with tempfile.TemporaryDirectory(prefix="ocr-") as tmp:
+        src = Path(tmp) / "page.png"
+        src.write_bytes(_prepare(image))
+        proc = subprocess.run(
+            [TESSERACT_CMD, str(src), "stdout", "-l", OCR_LANG, "--psm", OCR_PSM, "tsv"],
+            capture_output=True,
+            timeout=OCR_TIMEOUT,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError("tesseract failed: {}".format(proc.stderr.decode("utf-8", "replace").strip()[:200]))
+    return OcrResult(_parse_tsv(proc.stdout.decode("utf-8", "replace")), time.perf_counter() - t0)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, Tuple
+
+from .http_cache import CachedBody, make_cached_body
+
+PAGE_CACHE_CONTROL = os.getenv("PAGE_CACHE_CONTROL", "public, max-age=60")
+
+class PageCache:
+    """
+    Cache van gerenderde HTML-pagina's. Per pagina wordt één versie bewaard,
+    samen met de sleutel waarmee ze gerenderd is (bv. de catalogusversie):
+    verandert de sleutel, dan wordt de pagina één keer opnieuw gerenderd.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pages: Dict[str, Tuple[Hashable, CachedBody]] = {}
+
+    def get(self, page: str, key: Hashable, render: Callable[[], str]) -> CachedBody:
+        hit = self._pages.get(page)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        with self._lock:
+            hit = self._pages.get(page)
+            if hit is not None and hit[0] == key:
+                return hit[1]
+            cached = make_cached_body(
+                render().encode("utf-8"),
+                media_type="text/html; charset=utf-8",
+                last_modified=time.time(),
+                headers={"Cache-Control": PAGE_CACHE_CONTROL},
+            )
+            self._pages[page] = (key, cached)
+            return cached
+
+page_cache = PageCache()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .artifacts import atomic_write
+
+DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
+PDF_CACHE_FILE = DATA_DIR / "pdf_cache.json"
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "256"))
+PDF_CACHE_MAX_AGE_DAYS = int(os.getenv("PDF_CACHE_MAX_AGE_DAYS", "400"))
+
+Ranges = List[Tuple[int, int]]
+
+class PdfCache:
+    """
+    Persistente cache van geparste zone-PDF's.
+
+    Per URL bewaren we de ETag/Last-Modified van de laatste download, de
+    SHA-256 van de bytes en de geëxtraheerde licensed/free ranges (kHz).
+    Daarmee kan een run een conditionele GET doen en, als de PDF niet
+    veranderd is, zowel de transfer als de parse overslaan.
+    """
+
+    def __init__(self, path: Path = PDF_CACHE_FILE, max_entries: int = PDF_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        # caller holds self._lock
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        with self._lock:
+            entry = self._load().get(url)
+        headers: Dict[str, str] = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def sha256(self, url: str) -> Optional[str]:
+        """
+        SHA-256 van de laatst gedownloade bytes voor `url` (bv. na een 304).
+        """
+        with self._lock:
+            entry = self._load().get(url)
+        return entry.get("sha256") or None if entry else None
+
+    def lookup(self, url: str, sha256: Optional[str] = None) -> Optional[Tuple[Ranges, Ranges]]:
+        """
+        Geeft de gecachte ranges voor `url` terug. Met `sha256` moet ook de
+        inhoud overeenkomen; zonder (na een 304) volstaat de URL.
+        """
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(url)
+            if entry is not None and sha256 is not None and entry.get("sha256") != sha256:
+                # zelfde bytes onder een andere URL (bv. hernoemde PDF)
+                entry = next((e for e in entries.values() if e.get("sha256") == sha256), None)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["last_used"] = time.time()
+            self.hits += 1
+            return _ranges(entry["licensed"]), _ranges(entry["free"])
+
+    def store(
+        self,
+        url: str,
+        sha256: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        licensed: Ranges,
+        free: Ranges,
+    ) -> None:
+        with self._lock:
+            self._load()[url] = {
+                "sha256": sha256,
+                "etag": etag,
+                "last_modified": last_modified,
+                "licensed": [list(r) for r in licensed],
+                "free": [list(r) for r in free],
+                "last_used": time.time(),
+            }
+
+    def save(self) -> None:
+        """
+        Verwijdert verouderde entries (ouder dan PDF_CACHE_MAX_AGE_DAYS, en
+        de minst recent gebruikte boven PDF_CACHE_MAX_ENTRIES) en schrijft de
+        cache weg.
+        """
+        with self._lock:
+            entries = self._load()
+            cutoff = time.time() - PDF_CACHE_MAX_AGE_DAYS * 86400
+            kept = sorted(
+                ((url, e) for url, e in entries.items() if e.get("last_used", 0) >= cutoff),
+                key=lambda kv: kv[1].get("last_used", 0),
+                reverse=True,
+            )[: self.max_entries]
+            self._entries = dict(kept)
+            atomic_write(self.path, json.dumps(self._entries).encode("utf-8"))
+
+def _ranges(raw: List[List[int]]) -> Ranges:
+    return [(int(s), int(e)) for s, e in raw]
+
+pdf_cache = PdfCache()
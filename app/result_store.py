@@ -0,0 +1,197 @@
+from __future__ import annotations
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from .artifacts import atomic_write
+from .http_cache import CachedBody, make_cached_body
+
+# Resultaten (en oude losse CSV/TXT/JSON/FXL-bestanden) worden na zoveel dagen verwijderd
+RESULT_TTL_DAYS = float(os.getenv("RESULT_TTL_DAYS", "7"))
+# Geheugen voor gerenderde downloads (incl. gzip/brotli-varianten), LRU
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Grotere downloads gaan rechtstreeks van schijf (geen kopie in het geheugen, geen brotli-11)
+RESULT_INLINE_MAX_BYTES = int(os.getenv("RESULT_INLINE_MAX_BYTES", str(256 * 1024)))
+
+# save() ruimt hoogstens zo vaak op (seconden); daarnaast draait gc() periodiek
+_GC_INTERVAL = 3600
+
+@dataclass(frozen=True)
+class OutputFormat:
+    render: Callable[[Dict[str, Any]], Iterable[bytes]]  # chunks, zie xml_stream.encode_chunks
+    media_type: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+def _cached_size(cached: CachedBody) -> int:
+    return len(cached.body) + sum(len(v) for v in cached.variants.values())
+
+class ResultStore:
+    """
+    Resultaten van de exclusion builder: per job één gzip-JSON met het
+    genormaliseerde resultaat (kHz) en de ruwe payload, in `directory/results`.
+
+    Downloadformaten worden pas bij de eerste download gerenderd, via
+    `formats`, in chunks naar `results/<job>.<formaat>` (één keer per job en
+    formaat). Kleine bestanden gaan daarna als CachedBody (ETag, gzip/brotli)
+    in een LRU van hoogstens RESULT_CACHE_MAX_BYTES; grotere worden van
+    schijf geserveerd. Jobs van vóór deze store (losse
+    `<job>.<formaat>`-bestanden in `directory`) blijven downloadbaar tot ze
+    vervallen.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        formats: Dict[str, OutputFormat],
+        ttl_days: float = RESULT_TTL_DAYS,
+        cache_bytes: int = RESULT_CACHE_MAX_BYTES,
+        inline_bytes: int = RESULT_INLINE_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.results_dir = directory / "results"
+        self.formats = formats
+        self.ttl = ttl_days * 86400
+        self.cache_bytes = cache_bytes
+        self.inline_bytes = inline_bytes
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], CachedBody]" = OrderedDict()
+        self._cached_bytes = 0
+        self._last_gc = 0.0
+        self.hits = 0
+        self.renders = 0
+        self.streamed = 0
+        self.removed = 0
+
+    def _path(self, job_id: str) -> Path:
+        return self.results_dir / f"{job_id}.json.gz"
+
+    def _expired(self, mtime: float) -> bool:
+        return mtime < time.time() - self.ttl
+
+    def save(self, job_id: str, result: Dict[str, Any]) -> None:
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(result, separators=(",", ":")).encode("utf-8")
+        atomic_write(self._path(job_id), gzip.compress(data, compresslevel=6, mtime=0))
+        if time.time() - self._last_gc >= _GC_INTERVAL:
+            self.gc()
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(job_id)
+        try:
+            if self._expired(path.stat().st_mtime):
+                return None
+            return json.loads(gzip.decompress(path.read_bytes()))
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+
+    def _rendered(self, job_id: str, fmt: str) -> Optional[Path]:
+        # gerenderd bestand voor deze job, zo nodig eerst renderen; None als de job niet (meer) bestaat
+        try:
+            mtime = self._path(job_id).stat().st_mtime
+        except FileNotFoundError:
+            legacy = self.directory / f"{job_id}.{fmt}"
+            try:
+                return None if self._expired(legacy.stat().st_mtime) else legacy
+            except FileNotFoundError:
+                return None
+        if self._expired(mtime):
+            return None
+        out = self.results_dir / f"{job_id}.{fmt}"
+        if not out.exists():
+            result = self.load(job_id)
+            if result is None:
+                return None
+            # twee gelijktijdige renders van dezelfde job zijn onschuldig: atomic_write
+            atomic_write(out, self.formats[fmt].render(result))
+            with self._lock:
+                self.renders += 1
+        return out
+
+    def get(self, job_id: str, fmt: str) -> Union[CachedBody, Path, None]:
+        """
+        Download voor een job: een CachedBody (klein), het pad van het
+        gerenderde bestand (groter dan inline_bytes), of None als de job niet
+        (meer) bestaat.
+        """
+        key = (job_id, fmt)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+        path = self._rendered(job_id, fmt)
+        try:
+            st = path.stat() if path is not None else None
+        except FileNotFoundError:  # net opgeruimd
+            st = None
+        if path is None or st is None:
+            return None
+        if st.st_size > self.inline_bytes:
+            with self._lock:
+                self.streamed += 1
+            return path
+        spec = self.formats[fmt]
+        cached = make_cached_body(path.read_bytes(), spec.media_type, last_modified=st.st_mtime, headers=spec.headers)
+        size = _cached_size(cached)
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._cached_bytes -= _cached_size(old)
+            self._cache[key] = cached
+            self._cached_bytes += size
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= _cached_size(evicted)
+        return cached
+
+    def gc(self) -> int:
+        """
+        Verwijdert vervallen resultaten en oude losse outputbestanden;
+        geeft het aantal verwijderde bestanden terug.
+        """
+        self._last_gc = time.time()
+        cutoff = self._last_gc - self.ttl
+        candidates = list(self.results_dir.glob("*")) if self.results_dir.exists() else []
+        if self.directory.exists():
+            for fmt in self.formats:
+                candidates.extend(self.directory.glob(f"*.{fmt}"))
+        removed = set()
+        for path in candidates:
+            try:
+                if path.is_file() and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed.add(path.name.split(".", 1)[0])
+            except OSError:
+                pass
+        # gerenderde bestanden van een vervallen job horen er ook bij, ook al zijn ze jonger
+        for job_id in removed:
+            for fmt in self.formats:
+                (self.results_dir / f"{job_id}.{fmt}").unlink(missing_ok=True)
+        with self._lock:
+            for key in [k for k in self._cache if k[0] in removed]:
+                self._cached_bytes -= _cached_size(self._cache.pop(key))
+            self.removed += len(removed)
+        return len(removed)
+
+    def stats(self) -> Dict[str, int]:
+        try:
+            jobs = sum(1 for _ in self.results_dir.glob("*.json.gz"))
+        except OSError:
+            jobs = 0
+        with self._lock:
+            return {
+                "jobs": jobs,
+                "cached": len(self._cache),
+                "cached_bytes": self._cached_bytes,
+                "hits": self.hits,
+                "renders": self.renders,
+                "streamed": self.streamed,
+                "removed": self.removed,
+            }
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Set, Tuple
+
+from .storage import apply_stats_batch, visitor_hash
+
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "5"))
+STATS_FLUSH_THRESHOLD = int(os.getenv("STATS_FLUSH_THRESHOLD", "500"))
+
+class StatsBuffer:
+    """
+    Write-behind aggregator voor pageviews, unieke bezoekers en downloads.
+
+    De request-path telt enkel in geheugen op; een achtergrond-thread schrijft
+    de deltas periodiek (of zodra `flush_threshold` events wachten) in één
+    SQLite-transactie weg.
+    """
+
+    def __init__(self, flush_interval: float = STATS_FLUSH_INTERVAL, flush_threshold: int = STATS_FLUSH_THRESHOLD):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._downloads: Dict[str, int] = {}
+        self._uniques: Set[Tuple[str, str]] = set()
+        self._pending = 0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def inc_counter(self, key: str, delta: int = 1) -> None:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + delta
+            self._bump()
+
+    def inc_download(self, filename: str, delta: int = 1) -> None:
+        with self._lock:
+            self._downloads[filename] = self._downloads.get(filename, 0) + delta
+            self._counters["downloads_total"] = self._counters.get("downloads_total", 0) + delta
+            self._bump()
+
+    def mark_unique(self, visitor_id: str) -> None:
+        day = datetime.now().strftime("%Y-%m-%d")
+        h = visitor_hash(visitor_id)
+        with self._lock:
+            self._uniques.add((day, h))
+            self._bump()
+
+    def _bump(self) -> None:
+        # caller holds self._lock
+        self._pending += 1
+        if self._pending >= self.flush_threshold:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """
+        Schrijft alle openstaande deltas weg. Bij een fout worden ze terug
+        in de buffer gezet zodat niets verloren gaat.
+        """
+        with self._flush_lock:
+            with self._lock:
+                counters, self._counters = self._counters, {}
+                downloads, self._downloads = self._downloads, {}
+                uniques, self._uniques = self._uniques, set()
+                pending, self._pending = self._pending, 0
+            try:
+                apply_stats_batch(counters, downloads, sorted(uniques))
+            except Exception:
+                with self._lock:
+                    for k, v in counters.items():
+                        self._counters[k] = self._counters.get(k, 0) + v
+                    for k, v in downloads.items():
+                        self._downloads[k] = self._downloads.get(k, 0) + v
+                    self._uniques |= uniques
+                    # zonder deze telling wacht de drempel op een volledige nieuwe batch
+                    self._pending += pending
+                raise
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stopt de flusher en doet een laatste flush (bij shutdown).
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                # database tijdelijk niet beschikbaar: volgende ronde opnieuw
+                pass
+
+stats_buffer = StatsBuffer()
@@ -1,20 +1,102 @@
 from __future__ import annotations
 import os
+import queue
 import sqlite3
 import hashlib
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
 DB_PATH = DATA_DIR / "stats.sqlite3"
 META_PATH = DATA_DIR / "meta.json"
 
-def _conn():
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    c = sqlite3.connect(DB_PATH)
-    c.execute("PRAGMA journal_mode=WAL;")
-    return c
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+class _ConnectionPool:
+    """
+    Begrensde pool van persistente SQLite-connecties.
+
+    Elke connectie wordt één keer geopend en getuned (WAL, synchronous=NORMAL,
+    busy_timeout, mmap_size) en daarna hergebruikt, zodat de statement-cache
+    van sqlite3 de vaste queries hieronder voorbereid houdt.
+    """
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = max(1, size)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        c = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+            check_same_thread=False,
+            cached_statements=64,
+        )
+        c.execute("PRAGMA journal_mode=WAL;")
+        c.execute("PRAGMA synchronous=NORMAL;")
+        c.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS};")
+        c.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE};")
+        return c
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._created -= 1
+                    raise
+        # pool vol: wachten tot een andere thread een connectie teruggeeft
+        return self._idle.get()
+
+    def release(self, c: sqlite3.Connection) -> None:
+        self._idle.put(c)
+
+    def discard(self, c: sqlite3.Connection) -> None:
+        try:
+            c.close()
+        finally:
+            with self._lock:
+                self._created -= 1
+
+    def close(self) -> None:
+        while True:
+            try:
+                c = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(c)
+
+_pool = _ConnectionPool(DB_PATH, DB_POOL_SIZE)
+
+@contextmanager
+def _conn() -> Iterator[sqlite3.Connection]:
+    """
+    Leent een connectie uit de pool; commit bij succes, rollback bij een fout.
+    """
+    c = _pool.acquire()
+    try:
+        with c:
+            yield c
+    finally:
+        _pool.release(c)
+
+def close_db() -> None:
+    _pool.close()
 
 def init_db():
     with _conn() as con:
@@ -40,16 +122,6 @@ def init_db():
         con.execute("INSERT OR IGNORE INTO counters(key,value) VALUES ('pageviews',0)")
         con.execute("INSERT OR IGNORE INTO counters(key,value) VALUES ('downloads_total',0)")
 
-def inc_counter(key: str, delta: int = 1):
-    with _conn() as con:
-        con.execute("UPDATE counters SET value = value + ? WHERE key = ?", (delta, key))
-
-def inc_download(filename: str, delta: int = 1):
-    with _conn() as con:
-        con.execute("INSERT OR IGNORE INTO downloads(filename,count) VALUES (?,0)", (filename,))
-        con.execute("UPDATE downloads SET count = count + ? WHERE filename = ?", (delta, filename))
-        con.execute("UPDATE counters SET value = value + ? WHERE key = 'downloads_total'", (delta,))
-
 def get_stats() -> Dict[str, Any]:
     with _conn() as con:
         counters = dict(con.execute("SELECT key,value FROM counters").fetchall())
@@ -64,11 +136,33 @@ def get_stats() -> Dict[str, Any]:
         "uniques_today": uniques_today,
     }
 
-def mark_unique(visitor_id: str):
+def visitor_hash(visitor_id: str) -> str:
+    return hashlib.sha256(visitor_id.encode("utf-8")).hexdigest()[:32]
+
+def apply_stats_batch(
+    counters: Dict[str, int],
+    downloads: Dict[str, int],
+    uniques: List[Tuple[str, str]],
+) -> None:
     """
-    visitor_id: string (bv. ip + user-agent). We hash it, store hash only.
+    Schrijft een verzameling deltas (zie stats_buffer) in één transactie weg.
     """
-    day = datetime.now().strftime("%Y-%m-%d")
-    h = hashlib.sha256(visitor_id.encode("utf-8")).hexdigest()[:32]
+    if not counters and not downloads and not uniques:
+        return
     with _conn() as con:
-        con.execute("INSERT OR IGNORE INTO uniques(day, visitor_hash) VALUES (?,?)", (day, h))
+        con.executemany(
+            "UPDATE counters SET value = value + ? WHERE key = ?",
+            [(delta, key) for key, delta in counters.items()],
+        )
+        con.executemany(
+            "INSERT OR IGNORE INTO downloads(filename,count) VALUES (?,0)",
+            [(filename,) for filename in downloads],
+        )
+        con.executemany(
+            "UPDATE downloads SET count = count + ? WHERE filename = ?",
+            [(delta, filename) for filename, delta in downloads.items()],
+        )
+        con.executemany(
+            "INSERT OR IGNORE INTO uniques(day, visitor_hash) VALUES (?,?)",
+            uniques,
+        )
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
+from starlette.datastructures import UploadFile
+from starlette.exceptions import HTTPException
+
+from .executors import run_io
+
+# Maximum grootte van een upload-request met één afbeelding (batches: BATCH_MAX_BYTES)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Upload-mappen die (na een crash) blijven staan, worden na zoveel seconden opgeruimd
+_STALE_SECONDS = 24 * 3600
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail="Upload too large (max {:g} MB)".format(limit / (1024 * 1024)))
+
+async def _reject(send: Callable[[Message], Awaitable[None]], limit: int) -> None:
+    body = UploadTooLarge(limit).detail.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class UploadLimitMiddleware:
+    """
+    ASGI-middleware die POST-requests naar de paden in `limits` begrenst
+    tot het bijhorende aantal bytes: een te grote Content-Length wordt
+    meteen met 413 geweigerd, zonder de body te lezen; zonder (of met een
+    foute) Content-Length wordt geteld tijdens het ontvangen en stopt de
+    request zodra de limiet overschreden is.
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]], limits: Dict[str, int]):
+        self.app = app
+        self.limits = dict(limits)
+
+    async def __call__(self, scope: Scope, receive: Callable[[], Awaitable[Message]], send: Callable[[Message], Awaitable[None]]) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        try:
+            declared = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            declared = 0
+        if declared > limit:
+            await _reject(send, limit)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # komt als HTTPException(413) bij FastAPI's form-parsing terecht
+                    raise UploadTooLarge(limit)
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except UploadTooLarge:
+            if not started:
+                await _reject(send, limit)
+
+def new_upload_dir(root: Path) -> Path:
+    """
+    Eigen map per request onder `root`; oude mappen (crash) worden opgeruimd.
+    """
+    cutoff = time.time() - _STALE_SECONDS
+    if root.exists():
+        for old in root.iterdir():
+            try:
+                if old.stat().st_mtime < cutoff:
+                    shutil.rmtree(old, ignore_errors=True)
+            except OSError:
+                pass
+    path = root / uuid.uuid4().hex
+    path.mkdir(parents=True)
+    return path
+
+def _copy(upload: UploadFile, dest: Path) -> int:
+    upload.file.seek(0)
+    size = 0
+    with open(dest, "wb") as fh:
+        while True:
+            chunk = upload.file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            fh.write(chunk)
+    return size
+
+async def spool_upload(upload: UploadFile, dest: Path) -> int:
+    """
+    Kopieert een upload in chunks naar `dest` (in de I/O-pool) zonder hem
+    volledig in geheugen te laden; geeft het aantal bytes terug.
+    """
+    return await run_io(_copy, upload, dest)
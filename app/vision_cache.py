@@ -0,0 +1,246 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .artifacts import atomic_write
+
+VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "500"))
+VISION_CACHE_TTL_DAYS = float(os.getenv("VISION_CACHE_TTL_DAYS", "30"))
+# Max. dHash-afstand (op 256 bits) om een entry als kandidaat te bekijken; -1 = enkel exacte treffers
+VISION_CACHE_PHASH_DISTANCE = int(os.getenv("VISION_CACHE_PHASH_DISTANCE", "6"))
+# Een kandidaat telt pas als de thumbnails op hoogstens zoveel pixels sterk verschillen
+VISION_CACHE_MAX_DIFF_PIXELS = int(os.getenv("VISION_CACHE_MAX_DIFF_PIXELS", "0"))
+# Lange zijde van de grijswaarden-thumbnail die per entry bewaard wordt
+VISION_CACHE_THUMB_EDGE = int(os.getenv("VISION_CACHE_THUMB_EDGE", "1024"))
+
+# dHash-raster: HASH_SIZE x HASH_SIZE bits
+HASH_SIZE = 16
+# Beeldverhouding moet binnen deze marge liggen voor een perceptuele treffer
+_ASPECT_TOLERANCE = 0.02
+# Grijswaardeverschil vanaf waar een pixel als "anders" telt (JPEG-ruis blijft eronder)
+_PIXEL_DIFF = 64
+# Aantal kandidaten dat per lookup pixel-voor-pixel vergeleken wordt
+_MAX_CANDIDATES = 4
+
+@dataclass
+class ImageSignature:
+    sha256: str  # van de gedecodeerde pixels, los van container en metadata
+    dhash: str
+    aspect: float
+    thumb: Any  # PIL.Image in modus "L"
+
+def image_signature(image: Union[bytes, Path]) -> Optional[ImageSignature]:
+    """
+    Signatuur van een afbeelding, of None als Pillow ontbreekt of de
+    afbeelding niet te decoderen is (dan enkel caching op de ruwe bytes).
+    """
+    try:
+        from PIL import Image, ImageOps
+    except Exception:
+        return None
+    try:
+        img = ImageOps.exif_transpose(Image.open(BytesIO(image) if isinstance(image, bytes) else image))
+        rgb = img.convert("RGB")
+    except Exception:
+        return None
+    digest = hashlib.sha256("{}x{}:".format(*rgb.size).encode("ascii"))
+    digest.update(rgb.tobytes())
+
+    gray = rgb.convert("L")
+    scale = min(1.0, VISION_CACHE_THUMB_EDGE / max(gray.size))
+    thumb = gray
+    if scale < 1.0:
+        thumb = gray.resize((max(1, round(gray.width * scale)), max(1, round(gray.height * scale))), Image.Resampling.BOX)
+
+    small = thumb.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    px = small.tobytes()
+    w = HASH_SIZE + 1
+    bits = 0
+    for y in range(HASH_SIZE):
+        row = px[y * w:(y + 1) * w]
+        for x in range(HASH_SIZE):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return ImageSignature(
+        sha256=digest.hexdigest(),
+        dhash=format(bits, "0{}x".format(HASH_SIZE * HASH_SIZE // 4)),
+        aspect=gray.width / gray.height,
+        thumb=thumb,
+    )
+
+def _hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+def _differing_pixels(a: Any, b: Any) -> int:
+    from PIL import Image, ImageChops
+
+    if b.size != a.size:
+        b = b.resize(a.size, Image.Resampling.BOX)
+    return sum(ImageChops.difference(a, b).histogram()[_PIXEL_DIFF:])
+
+class VisionCache:
+    """
+    Cache van genormaliseerde vision-resultaten (frequenties/ranges en de
+    ruwe modelpayload) vóór `_call_openai`, in `directory`: index.json plus
+    per entry een grijswaarden-thumbnail.
+
+    Sleutel: hash van model en prompt plus de SHA-256 van de gedecodeerde
+    pixels, zodat een opnieuw opgeslagen bestand (andere container, EXIF
+    weg) ook treft. Een opnieuw gecomprimeerde kopie wordt via een dHash
+    gevonden, maar telt pas na een pixelvergelijking met de thumbnail: op
+    tekst (frequentielijsten) ziet een dHash geen verschil tussen twee
+    cijfers, de pixelvergelijking wel.
+
+    Entries vervallen na VISION_CACHE_TTL_DAYS; boven
+    VISION_CACHE_MAX_ENTRIES gaan de minst recent gebruikte eruit (LRU).
+    """
+
+    def __init__(self, directory: Path, max_entries: int = VISION_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.index_path = directory / "index.json"
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def prompt_key(model: str, prompt: str) -> str:
+        return hashlib.sha256("{}\0{}".format(model, prompt).encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def key(prompt_key: str, sha256: str) -> str:
+        return prompt_key + "-" + sha256
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        # caller holds self._lock
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _thumb_path(self, key: str) -> Path:
+        return self.directory / (key + ".png")
+
+    def _candidates(self, prompt_key: str, sig: ImageSignature, cutoff: float) -> List[str]:
+        # caller holds self._lock
+        scored = []
+        for key, e in self._load().items():
+            if e.get("prompt") != prompt_key or not e.get("dhash") or e.get("created", 0) < cutoff:
+                continue
+            if abs(e.get("aspect", 0) - sig.aspect) > _ASPECT_TOLERANCE * sig.aspect:
+                continue
+            d = _hamming(e["dhash"], sig.dhash)
+            if d <= VISION_CACHE_PHASH_DISTANCE:
+                scored.append((d, key))
+        return [key for _, key in sorted(scored)[:_MAX_CANDIDATES]]
+
+    def _verify(self, key: str, sig: ImageSignature) -> bool:
+        try:
+            from PIL import Image
+
+            with Image.open(self._thumb_path(key)) as im:
+                thumb = im.convert("L")
+        except Exception:
+            return False
+        return _differing_pixels(thumb, sig.thumb) <= VISION_CACHE_MAX_DIFF_PIXELS
+
+    def lookup(self, sha256: str, prompt_key: str, sig: Optional[ImageSignature]) -> Optional[Dict[str, Any]]:
+        """
+        `sha256` is de hash van de bytes; met een signatuur wordt de
+        pixelhash gebruikt en is een perceptuele treffer mogelijk.
+        """
+        now = time.time()
+        cutoff = now - VISION_CACHE_TTL_DAYS * 86400
+        key = self.key(prompt_key, sig.sha256 if sig is not None else sha256)
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None and entry.get("created", 0) >= cutoff:
+                entry["last_used"] = now
+                self.hits += 1
+                return entry["result"]
+            candidates: List[str] = []
+            if sig is not None and VISION_CACHE_PHASH_DISTANCE >= 0:
+                candidates = self._candidates(prompt_key, sig, cutoff)
+
+        # pixelvergelijking buiten de lock: thumbnails lezen kost I/O
+        for cand in candidates:
+            if self._verify(cand, sig):
+                with self._lock:
+                    entry = self._load().get(cand)
+                    if entry is None:
+                        continue
+                    entry["last_used"] = now
+                    self.hits += 1
+                    self.perceptual_hits += 1
+                    return entry["result"]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, sha256: str, prompt_key: str, sig: Optional[ImageSignature], result: Dict[str, Any]) -> None:
+        now = time.time()
+        key = self.key(prompt_key, sig.sha256 if sig is not None else sha256)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if sig is not None:
+            buf = BytesIO()
+            sig.thumb.save(buf, format="PNG", optimize=False)
+            atomic_write(self._thumb_path(key), buf.getvalue())
+        with self._lock:
+            self._load()[key] = {
+                "prompt": prompt_key,
+                "dhash": sig.dhash if sig is not None else None,
+                "aspect": sig.aspect if sig is not None else None,
+                "result": result,
+                "created": now,
+                "last_used": now,
+            }
+        self.save()
+
+    def save(self) -> None:
+        """
+        Voegt de entries samen met wat andere workers intussen wegschreven,
+        past TTL en LRU toe en schrijft de index atomisch weg.
+        """
+        cutoff = time.time() - VISION_CACHE_TTL_DAYS * 86400
+        with self._lock:
+            merged = self._read()
+            for key, e in self._load().items():
+                other = merged.get(key)
+                if other is None or e.get("last_used", 0) >= other.get("last_used", 0):
+                    merged[key] = e
+            kept = sorted(
+                ((k, e) for k, e in merged.items() if e.get("created", 0) >= cutoff),
+                key=lambda kv: kv[1].get("last_used", 0),
+                reverse=True,
+            )[: self.max_entries]
+            dropped = set(merged) - {k for k, _ in kept}
+            self._entries = dict(kept)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.index_path, json.dumps(self._entries).encode("utf-8"))
+        for key in dropped:
+            try:
+                self._thumb_path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries or {}),
+                "hits": self.hits,
+                "perceptual_hits": self.perceptual_hits,
+                "misses": self.misses,
+            }
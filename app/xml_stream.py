@@ -0,0 +1,44 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Grootte van de chunks die naar een bestand of StreamingResponse gaan
+CHUNK_SIZE = 64 * 1024
+
+def xml_escape(s: str) -> str:
+    return (
+        s.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("'", "&apos;")
+    )
+
+def encode_chunks(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE, encoding: str = "utf-8") -> Iterator[bytes]:
+    """
+    Bundelt kleine tekststukken (typisch één XML-regel inclusief "\\n") tot
+    geëncodeerde chunks van ongeveer `chunk_size` bytes. Het geheugengebruik
+    blijft zo begrensd tot één chunk, los van de grootte van het document.
+    """
+    buf: list = []
+    size = 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buf).encode(encoding)
+            buf = []
+            size = 0
+    if buf:
+        yield "".join(buf).encode(encoding)
+
+def write_chunks(path: Path, chunks: Iterable[bytes]) -> int:
+    """
+    Schrijft chunks rechtstreeks naar `path`; geeft het aantal bytes terug.
+    """
+    written = 0
+    with open(path, "wb") as fh:
+        for chunk in chunks:
+            fh.write(chunk)
+            written += len(chunk)
+    return written
@@ -0,0 +1,161 @@
+"""
+Extractie-engines van de exclusion builder naast elkaar: latency en
+nauwkeurigheid (precision/recall per kHz) op een gegenereerde set
+frequentielijsten met gekende inhoud.
+
+    python -m bench.bench_engines --sheets 8 --engines parser local openai auto
+
+- parser: `_parse_ocr_lines` op de exacte tekst (bovengrens voor de parser, geen OCR)
+- local:  Tesseract in de process-pool + parser (slaat over zonder tesseract)
+- openai: het vision-model (slaat over zonder OPENAI_API_KEY; kost geld)
+- auto:   local, en naar openai bij een confidence onder OCR_MIN_CONFIDENCE
+
+Varianten per blad: clean, noisy (ruis + blur), small (800 px breed), rotated (1.5°).
+Elke engine start met een lege vision-cache.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+_TMP = tempfile.mkdtemp(prefix="wwb-bench-")
+os.environ["DATA_DIR"] = _TMP
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from app import exclusion_builder  # noqa: E402
+from app.executors import shutdown_executors  # noqa: E402
+from app.intervals import IntervalSet  # noqa: E402
+from app.vision_cache import VisionCache  # noqa: E402
+
+Truth = Tuple[Set[int], Set[Tuple[int, int]]]
+
+
+def make_sheet(seed: int) -> Tuple[List[str], Truth]:
+    """Regels van een frequentielijst (kanalen, ranges, ruis) en de verwachte kHz-waarden."""
+    rnd = random.Random(seed)
+    lines = ["Frequency plan - stage {}".format(seed + 1), "Date 16.10.2026   Level -12.5 dB"]
+    freqs: Set[int] = set()
+    ranges: Set[Tuple[int, int]] = set()
+    for ch in range(rnd.randint(10, 20)):
+        khz = rnd.randrange(470000, 698000, 25)
+        freqs.add(khz)
+        value = "{:.3f}".format(khz / 1000)
+        if rnd.random() < 0.3:
+            value = value.replace(".", ",")
+        lines.append("CH{:02d}  {}  {}".format(ch + 1, value, rnd.choice(["MHz", "", "MHz  IEM", "  Mic"])))
+    for _ in range(rnd.randint(1, 3)):
+        start = rnd.randrange(470000, 690000, 1000)
+        end = start + rnd.choice([2000, 6000, 8000])
+        ranges.add((start, end))
+        lines.append("Blocked  {:.3f} - {:.3f} MHz".format(start / 1000, end / 1000))
+    # de normalisatie voegt overlappende ranges samen en laat frequenties binnen een range weg
+    ranges = set(IntervalSet.from_pairs(ranges))
+    freqs = {f for f in freqs if not any(s <= f <= e for s, e in ranges)}
+    return lines, (freqs, ranges)
+
+
+def render(lines: List[str], variant: str) -> bytes:
+    w, line_h = 1600, 48
+    img = Image.new("L", (w, line_h * (len(lines) + 2)), 245)
+    draw = ImageDraw.Draw(img)
+    try:
+        from PIL import ImageFont
+
+        font = ImageFont.load_default(size=30)
+    except TypeError:
+        font = None
+    for i, line in enumerate(lines):
+        draw.text((40, line_h * (i + 1)), line, fill=20, font=font)
+    if variant == "noisy":
+        noise = Image.effect_noise(img.size, 40)
+        img = Image.blend(img, noise, 0.25).filter(ImageFilter.GaussianBlur(1.2))
+    elif variant == "small":
+        img = img.resize((800, img.height * 800 // img.width), Image.Resampling.BILINEAR)
+    elif variant == "rotated":
+        img = img.rotate(1.5, expand=True, fillcolor=245)
+    out = BytesIO()
+    img.convert("RGB").save(out, format="JPEG", quality=88)
+    return out.getvalue()
+
+
+def score(result: dict, truth: Truth) -> Tuple[int, int, int]:
+    """(true positives, found, expected) over frequencies and ranges, per kHz."""
+    got_f = {int(round(f * 1000)) for f in result["frequencies_mhz"]}
+    got_r = {(int(round(s * 1000)), int(round(e * 1000))) for s, e in result["ranges_mhz"]}
+    freqs, ranges = truth
+    return len(got_f & freqs) + len(got_r & ranges), len(got_f) + len(got_r), len(freqs) + len(ranges)
+
+
+def run_parser(lines: List[str]) -> dict:
+    payload, confidence = exclusion_builder._parse_ocr_lines([[(w, 100.0) for w in line.split()] for line in lines])
+    freqs, ranges = exclusion_builder._normalize_frequencies(payload)
+    return {"frequencies_mhz": freqs, "ranges_mhz": ranges, "engine": "parser", "escalated": False}
+
+
+def skip_reason(engine: str) -> str | None:
+    if engine in ("local", "auto") and not exclusion_builder.EXTRACTORS["local"].available():
+        return "tesseract not found"
+    if engine in ("openai",) and not exclusion_builder.EXTRACTORS["openai"].available():
+        return "OPENAI_API_KEY not set"
+    return None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sheets", type=int, default=8)
+    ap.add_argument("--variants", nargs="+", default=["clean", "noisy", "small", "rotated"])
+    ap.add_argument("--engines", nargs="+", default=["parser", "local", "openai", "auto"])
+    args = ap.parse_args()
+
+    fixtures = []
+    for seed in range(args.sheets):
+        lines, truth = make_sheet(seed)
+        for variant in args.variants:
+            fixtures.append((variant, lines, truth, render(lines, variant)))
+
+    print(f"{len(fixtures)} images ({args.sheets} sheets x {len(args.variants)} variants)")
+    print(f"{'engine':<8} {'variant':<8} {'p50 ms':>8} {'max ms':>8} {'precision':>10} {'recall':>8} {'escalated':>10}")
+    try:
+        for engine in args.engines:
+            reason = skip_reason(engine)
+            if reason:
+                print(f"{engine:<8} skipped: {reason}")
+                continue
+            # lege cache per engine
+            exclusion_builder.vision_cache = VisionCache(Path(_TMP) / "vision_cache" / engine)
+            rows: Dict[str, List[Tuple[float, Tuple[int, int, int], bool]]] = {}
+            for variant, lines, truth, data in fixtures:
+                t0 = time.perf_counter()
+                if engine == "parser":
+                    result = run_parser(lines)
+                else:
+                    result = exclusion_builder._extract_image(data, "image/jpeg", "sheet.jpg", "", engine=engine)
+                rows.setdefault(variant, []).append((time.perf_counter() - t0, score(result, truth), result["escalated"]))
+            for variant, measured in rows.items():
+                times = [t for t, _, _ in measured]
+                tp = sum(s[0] for _, s, _ in measured)
+                found = sum(s[1] for _, s, _ in measured)
+                expected = sum(s[2] for _, s, _ in measured)
+                escalated = sum(1 for _, _, e in measured if e)
+                print(
+                    f"{engine:<8} {variant:<8} {statistics.median(times) * 1000:>8.1f} {max(times) * 1000:>8.1f}"
+                    f" {tp / found if found else 0.0:>10.3f} {tp / expected if expected else 0.0:>8.3f}"
+                    f" {escalated:>5}/{len(measured):<4}"
+                )
+    finally:
+        shutdown_executors()
+
+
+if __name__ == "__main__":
+    main()
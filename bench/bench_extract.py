@@ -0,0 +1,50 @@
+"""
+Vergelijkt de PDF-tekstengines (pdfium en pdfplumber) op gegenereerde
+zone-PDF's: beide moeten dezelfde licensed/free ranges opleveren.
+
+    python -m bench.bench_extract --ranges 10 200 2000
+
+Extra PDF's (bv. echte BIPT-documenten) kunnen met --pdf meegegeven worden.
+Exit code 1 als een engine afwijkt.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.bipt_wwb import PDF_TEXT_ENGINES, _extract_ranges_split_from_pdf  # noqa: E402
+from bench.fixtures import make_pdf, make_zone_lines  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--ranges", type=int, nargs="+", default=[10, 200, 2000])
+    ap.add_argument("--pdf", type=Path, nargs="*", default=[], help="extra PDF-bestanden")
+    args = ap.parse_args()
+
+    fixtures = [(f"synthetic-{n}", make_pdf(make_zone_lines(n, seed=n))) for n in args.ranges]
+    fixtures += [(p.name, p.read_bytes()) for p in args.pdf]
+
+    engines = list(PDF_TEXT_ENGINES)
+    print(f"{'fixture':<24}" + "".join(f"{e + ' (s)':>16}" for e in engines) + "  ranges  same")
+    ok = True
+    for name, data in fixtures:
+        timings = []
+        results = []
+        for engine in engines:
+            t0 = time.perf_counter()
+            results.append(_extract_ranges_split_from_pdf(data, engine=engine))
+            timings.append(time.perf_counter() - t0)
+        same = all(r == results[0] for r in results[1:])
+        ok &= same
+        n_ranges = len(results[0][0]) + len(results[0][1])
+        print(f"{name:<24}" + "".join(f"{t:>16.3f}" for t in timings) + f"  {n_ranges:>6}  {same}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
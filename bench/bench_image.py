@@ -0,0 +1,97 @@
+"""
+Pre-processing van exclusion-builder uploads: conversietijd en payload per
+beeldgrootte, tegenover het oude gedrag (PNG -> JPEG q92 op volle resolutie,
+JPEG ongewijzigd). "payload" is de grootte na base64, zoals in de JSON-body.
+
+    python -m bench.bench_image --megapixels 1 4 12 24
+
+De testbeelden zijn gegenereerde "foto's van een frequentielijst": tekst op
+een licht ruisende achtergrond met een kleurverloop.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from app import image_prep  # noqa: E402
+
+
+def make_sheet(megapixels: float, seed: int = 0) -> Image.Image:
+    w = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    h = int(w * 3 / 4)
+    # kleurverloop + ruis, zodat de JPEG niet triviaal klein wordt
+    base = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+    noise = Image.effect_noise((w, h), 18).convert("RGB")
+    img = Image.blend(Image.new("RGB", (w, h), (236, 232, 220)), Image.blend(base, noise, 0.5), 0.25)
+    draw = ImageDraw.Draw(img)
+    line_h = max(12, h // 60)
+    for i in range(h // line_h - 2):
+        draw.text((w // 20, line_h * (i + 1)), "Ch {:03d}   {:.3f} MHz   CH{}".format(i, 470 + i * 0.725, 21 + i % 40), fill=(20, 20, 30))
+    return img.filter(ImageFilter.GaussianBlur(0.6))
+
+
+def _encode(img: Image.Image, fmt: str, **kw) -> bytes:
+    out = BytesIO()
+    img.save(out, format=fmt, **kw)
+    return out.getvalue()
+
+
+def _old_pipeline(data: bytes, mime: str) -> bytes:
+    # het vroegere _ensure_jpeg
+    if mime == "image/jpeg":
+        return data
+    img = Image.open(BytesIO(data))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    return _encode(img, "JPEG", quality=92)
+
+
+def _timed(fn: Callable[[], bytes], repeat: int) -> Tuple[float, bytes]:
+    best = float("inf")
+    out = b""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--megapixels", type=float, nargs="+", default=[1, 4, 12, 24])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--format", choices=["jpeg", "webp"], default=image_prep.IMAGE_FORMAT)
+    args = ap.parse_args()
+    image_prep.IMAGE_FORMAT = args.format
+
+    print(
+        f"{'input':<14} {'upload KiB':>10} {'old ms':>8} {'old payload KiB':>16}"
+        f" {'new ms':>8} {'new payload KiB':>16} {'out px':>11}"
+    )
+    for mp in args.megapixels:
+        img = make_sheet(mp)
+        for mime, data in (
+            ("image/jpeg", _encode(img, "JPEG", quality=95)),
+            ("image/png", _encode(img, "PNG", compress_level=1)),
+        ):
+            old_t, old = _timed(lambda: _old_pipeline(data, mime), args.repeat)
+            new_t, new = _timed(lambda: image_prep.prepare_image(data, mime).data, args.repeat)
+            out = Image.open(BytesIO(new))
+            label = "{:g}MP {}".format(mp, mime.split("/")[1])
+            print(
+                f"{label:<14} {len(data) / 1024:>10.0f} {old_t * 1000:>8.0f} {len(base64.b64encode(old)) / 1024:>16.0f}"
+                f" {new_t * 1000:>8.0f} {len(base64.b64encode(new)) / 1024:>16.0f} {'{}x{}'.format(*out.size):>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
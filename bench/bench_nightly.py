@@ -0,0 +1,125 @@
+"""
+Wall-clock van nightly_check_and_update tegenover het aantal zones, tegen een
+lokale HTTP-stub met gegenereerde zone-PDF's.
+
+    python -m bench.bench_nightly --zones 1 4 16 --ranges 200 --latency 0.2
+
+Elke meting draait met een lege DATA_DIR; de .ils-output van de sequentiële
+run (concurrency 1) en de parallelle run wordt vergeleken.
+
+Vooraf een failover-check: een leader neemt de lock, gebruikt de CPU-pool en
+crasht; daarna moet een ander proces de leader-lock kunnen nemen.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_TMP = tempfile.mkdtemp(prefix="wwb-bench-")
+os.environ["DATA_DIR"] = _TMP
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import bipt_wwb  # noqa: E402
+from app.executors import shutdown_executors  # noqa: E402
+from app.leader import FileLock  # noqa: E402
+from app.pdf_cache import pdf_cache  # noqa: E402
+from bench.fixtures import StubServer, publish_zones  # noqa: E402
+
+_VOLATILE = re.compile(r' (date|time|machine)="[^"]*"')
+
+
+def _reset_data_dir() -> None:
+    for p in Path(_TMP).rglob("*"):
+        if p.is_file():
+            p.unlink()
+    # koude run: ook de in-memory PDF-cache leegmaken
+    pdf_cache._entries = None
+
+
+_CRASHING_LEADER = """
+import os
+from app.executors import submit_cpu
+from app.leader import leader_lock
+assert leader_lock.acquire()
+submit_cpu(pow, 2, 3).result()
+os._exit(1)
+"""
+
+
+def check_failover() -> bool:
+    """Leader crasht na werk in de CPU-pool; is de leader-lock daarna vrij?"""
+    root = str(Path(__file__).resolve().parents[1])
+    # eigen sessie: de achtergebleven pool-processen van de leader achteraf opruimen
+    proc = subprocess.Popen(
+        [sys.executable, "-c", _CRASHING_LEADER],
+        cwd=root,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        if proc.wait(timeout=60) != 1:
+            raise RuntimeError(f"crashing leader exited with {proc.returncode}")
+        lock = FileLock(Path(_TMP) / "leader.lock")
+        # de pool-workers van de gecrashte leader lopen nog, maar mogen de lock niet vasthouden
+        for _ in range(20):
+            if lock.acquire():
+                lock.release()
+                return True
+            time.sleep(0.1)
+        return False
+    finally:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def _run(stub: StubServer, concurrency: int) -> tuple[float, str]:
+    _reset_data_dir()
+    bipt_wwb.BIPT_FETCH_CONCURRENCY = concurrency
+    t0 = time.perf_counter()
+    bipt_wwb.nightly_check_and_update()
+    elapsed = time.perf_counter() - t0
+    out = next(Path(_TMP).glob("bipt_inclusion_list_*.ils"))
+    return elapsed, _VOLATILE.sub("", out.read_text(encoding="utf-8"))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--zones", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    ap.add_argument("--ranges", type=int, default=200, help="tabelregels per zone-PDF")
+    ap.add_argument("--latency", type=float, default=0.2, help="kunstmatige latency per request (s)")
+    ap.add_argument("--concurrency", type=int, default=bipt_wwb.BIPT_FETCH_CONCURRENCY)
+    args = ap.parse_args()
+
+    # de stub serveert localhost-URL's in plaats van ihpbpmoqelm.bipt.be
+    bipt_wwb.PDF_RE = re.compile(
+        r"^https?://127\.0\.0\.1:\d+/micro/files/"
+        r"(?P<code>[A-Z]+)-(?P<lang>[A-Z]{2})-(?P<yy>\d{2})-(?P<q>[1-4])\.pdf$"
+    )
+    bipt_wwb._cleanup_old_files = lambda: None
+
+    print(f"failover after leader crash: {'ok' if check_failover() else 'FAILED (leader.lock still held)'}")
+    print(f"{'zones':>5} {'sequential (s)':>15} {'parallel (s)':>13} {'speedup':>8}  identical")
+    try:
+        for n in args.zones:
+            with StubServer(latency=args.latency) as stub:
+                bipt_wwb.BIPT_MICROS_URL = publish_zones(stub, n, args.ranges)
+                seq_t, seq_xml = _run(stub, 1)
+                par_t, par_xml = _run(stub, args.concurrency)
+            print(f"{n:>5} {seq_t:>15.3f} {par_t:>13.3f} {seq_t / par_t:>7.2f}x  {seq_xml == par_xml}")
+    finally:
+        shutdown_executors()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Normalisatie van extractieresultaten: de oude lus per item (str.replace,
+float(), re.split) tegenover de numpy-bulknormalisatie, op gegenereerde
+payloads met dubbels, overlappende ranges, kHz-waarden en rommel.
+
+    python -m bench.bench_normalize --entries 1000 10000 100000
+
+"old + merge" is de oude lus plus dezelfde nabewerking in gewone Python
+(ontdubbelen, IntervalSet, gedekte frequenties weg); die uitvoer moet gelijk
+zijn aan de nieuwe.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import freq_normalize  # noqa: E402
+from app.intervals import IntervalSet  # noqa: E402
+
+
+def make_payload(n: int, seed: int = 0) -> dict:
+    rnd = random.Random(seed)
+    freqs: List[Any] = []
+    for _ in range(n):
+        khz = rnd.randrange(470000, 700000, 25)
+        kind = rnd.random()
+        if kind < 0.4:
+            freqs.append(khz / 1000)
+        elif kind < 0.6:
+            freqs.append("{:.3f} MHz".format(khz / 1000))
+        elif kind < 0.7:
+            freqs.append("{:,}".format(khz))  # "470,125" -> kHz
+        elif kind < 0.8:
+            freqs.append(khz)  # kHz als getal
+        elif kind < 0.9:
+            freqs.append(rnd.choice(freqs) if freqs else khz)  # dubbel
+        else:
+            freqs.append(rnd.choice(["n/a", "", None, "12.5", "CH21", "9999999"]))
+    ranges: List[Any] = []
+    for _ in range(max(1, n // 100)):
+        start = rnd.randrange(470000, 700000, 25)
+        end = start + rnd.choice([25, 100, 500])
+        if rnd.random() < 0.5:
+            ranges.append([start / 1000, end / 1000] if rnd.random() < 0.5 else [end / 1000, start / 1000])
+        else:
+            ranges.append("{:.3f} - {:.3f} MHz".format(start / 1000, end / 1000))
+    return {"frequencies_mhz": freqs, "ranges_mhz": ranges}
+
+
+def _normalize_value(value: float) -> float:
+    if value > 3000:
+        return value / 1000.0
+    return value
+
+
+def old_normalize(payload: dict) -> Tuple[List[float], List[List[float]]]:
+    # de vroegere _normalize_frequencies
+    out_f: List[float] = []
+    for freq in payload.get("frequencies_mhz", []) or []:
+        if isinstance(freq, (int, float)):
+            out_f.append(_normalize_value(float(freq)))
+        elif isinstance(freq, str):
+            value = freq.strip().replace("MHz", "").replace("mhz", "").replace(",", "")
+            try:
+                out_f.append(_normalize_value(float(value)))
+            except ValueError:
+                pass
+    out_r: List[List[float]] = []
+    for item in payload.get("ranges_mhz", []) or []:
+        if isinstance(item, (list, tuple)) and len(item) == 2:
+            try:
+                start, end = _normalize_value(float(item[0])), _normalize_value(float(item[1]))
+            except (TypeError, ValueError):
+                continue
+            out_r.append([min(start, end), max(start, end)])
+        elif isinstance(item, str):
+            parts = re.split(r"[-–]\s*", item.replace("MHz", "").replace("mhz", "").replace(",", ""))
+            if len(parts) != 2:
+                continue
+            try:
+                start, end = _normalize_value(float(parts[0].strip())), _normalize_value(float(parts[1].strip()))
+            except ValueError:
+                continue
+            out_r.append([min(start, end), max(start, end)])
+    return out_f, out_r
+
+
+def old_with_merge(payload: dict) -> Tuple[List[float], List[List[float]]]:
+    freqs, ranges = old_normalize(payload)
+    lo, hi = round(freq_normalize.BAND_MIN_MHZ * 1000), round(freq_normalize.BAND_MAX_MHZ * 1000)
+    merged = IntervalSet.from_pairs(
+        (max(lo, round(s * 1000)), min(hi, round(e * 1000)))
+        for s, e in ranges
+        if round(e * 1000) >= lo and round(s * 1000) <= hi
+    ).to_pairs()
+    starts = [s for s, _ in merged]
+    kept = []
+    for khz in sorted({round(f * 1000) for f in freqs if lo <= round(f * 1000) <= hi}):
+        i = bisect.bisect_right(starts, khz) - 1
+        if i < 0 or khz > merged[i][1]:
+            kept.append(khz / 1000)
+    return kept, [[s / 1000, e / 1000] for s, e in merged]
+
+
+def new_normalize(payload: dict) -> Tuple[List[float], List[List[float]]]:
+    result = freq_normalize.normalize(payload["frequencies_mhz"], payload["ranges_mhz"])
+    return result.freqs_mhz(), result.ranges_mhz()
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(
+        f"{'entries':>8} {'old ms':>8} {'old+merge ms':>13} {'new ms':>8}"
+        f" {'numeric old+merge':>18} {'numeric new':>12} {'out f/r':>11} {'same':>5}"
+    )
+    for n in args.entries:
+        payload = make_payload(n)
+        numeric = {
+            "frequencies_mhz": [random.Random(i).randrange(470000, 700000, 25) / 1000 for i in range(n)],
+            "ranges_mhz": [[470.0 + i % 200, 470.1 + i % 200] for i in range(max(1, n // 100))],
+        }
+        old_t, _ = _timed(lambda: old_normalize(payload), args.repeat)
+        merge_t, expected = _timed(lambda: old_with_merge(payload), args.repeat)
+        new_t, got = _timed(lambda: new_normalize(payload), args.repeat)
+        num_old_t, num_expected = _timed(lambda: old_with_merge(numeric), args.repeat)
+        num_t, num_got = _timed(lambda: new_normalize(numeric), args.repeat)
+        same = got == expected and num_got == num_expected
+        out = "{}/{}".format(len(got[0]), len(got[1]))
+        print(
+            f"{n:>8} {old_t * 1000:>8.1f} {merge_t * 1000:>13.1f} {new_t * 1000:>8.1f}"
+            f" {num_old_t * 1000:>18.1f} {num_t * 1000:>12.1f} {out:>11} {str(same):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
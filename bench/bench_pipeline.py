@@ -0,0 +1,129 @@
+"""
+Benchmark van de BIPT-naar-ILS pipeline, per stage, volledig offline.
+
+Voor elke combinatie van --zones en --ranges wordt een lokale HTTP-stub
+opgezet met een synthetische micro's-pagina en gegenereerde zone-PDF's,
+waarna elke stage apart gemeten wordt (wall-clock en tracemalloc-piek):
+
+    fetch_html    _fetch_html() tegen de stub
+    parse_html    _parse_zone_pdfs() + _choose_latest_per_zone()
+    download      _download_pdf() per zone (zonder cache)
+    extract       _extract_ranges_split_from_pdf() per zone
+    merge         per-zone groepen + "Vrije frequenties" union
+    build_xml     _build_wwb_xml()
+
+    python -m bench.bench_pipeline --zones 1 10 100 --ranges 10 1000 10000
+    python -m bench.bench_pipeline --engine pdfplumber --zones 1 --ranges 10 1000
+
+Alles draait in één proces (geen process-pool) zodat de metingen niet van
+CPU_POOL_SIZE afhangen. tracemalloc ziet enkel Python-allocaties; de
+maxrss-kolom toont het piekgeheugen van het proces.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="wwb-bench-")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import bipt_wwb  # noqa: E402
+from app.intervals import IntervalSet  # noqa: E402
+from bench.fixtures import StubServer, publish_zones  # noqa: E402
+
+STAGES = ["fetch_html", "parse_html", "download", "extract", "merge", "build_xml"]
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+        self.peak_kib: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.peak_kib[name] = peak / 1024
+
+
+def run_once(stub: StubServer, engine: str) -> StageTimer:
+    timer = StageTimer()
+    tmp_dir = Path(os.environ["DATA_DIR"]) / "_tmp"
+
+    with timer.stage("fetch_html"):
+        html = bipt_wwb._fetch_html()
+    with timer.stage("parse_html"):
+        selected = bipt_wwb._choose_latest_per_zone(bipt_wwb._parse_zone_pdfs(html))
+    zones = sorted(selected.items(), key=lambda kv: kv[0].lower())
+    with timer.stage("download"):
+        downloads = [bipt_wwb._download_pdf(it, tmp_dir, conditional=False) for _, it in zones]
+    with timer.stage("extract"):
+        parsed = [bipt_wwb._extract_ranges_split_from_pdf(dl.source, engine=engine) for dl in downloads]
+    del downloads
+    with timer.stage("merge"):
+        groups = [(zone_name, licensed.union(free)) for (zone_name, _), (licensed, free) in zip(zones, parsed)]
+        groups.append(("Vrije frequenties", IntervalSet.union_all(free for _, free in parsed)))
+    with timer.stage("build_xml"):
+        bipt_wwb._build_wwb_xml("Benchmark", groups)
+    return timer
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--zones", type=int, nargs="+", default=[1, 10, 100])
+    ap.add_argument("--ranges", type=int, nargs="+", default=[10, 1000])
+    ap.add_argument("--engine", default=bipt_wwb.PDF_TEXT_ENGINE, choices=["auto", *bipt_wwb.PDF_TEXT_ENGINES])
+    ap.add_argument("--repeat", type=int, default=1, help="beste van N runs per stage")
+    ap.add_argument("--json", type=Path, help="resultaten ook als JSON wegschrijven")
+    args = ap.parse_args()
+
+    bipt_wwb.PDF_RE = re.compile(
+        r"^https?://127\.0\.0\.1:\d+/micro/files/"
+        r"(?P<code>[A-Z]+)-(?P<lang>[A-Z]{2})-(?P<yy>\d{2})-(?P<q>[1-4])\.pdf$"
+    )
+
+    header = f"{'zones':>5} {'ranges':>6} " + " ".join(f"{s + ' s':>12}" for s in STAGES)
+    header += " " + " ".join(f"{s + ' KiB':>14}" for s in ("extract", "build_xml")) + f" {'maxrss MiB':>11}"
+    print(header)
+    rows: List[dict] = []
+    for n_zones in args.zones:
+        for n_ranges in args.ranges:
+            with StubServer() as stub:
+                bipt_wwb.BIPT_MICROS_URL = publish_zones(stub, n_zones, n_ranges)
+                runs = [run_once(stub, args.engine) for _ in range(max(1, args.repeat))]
+            seconds = {s: min(r.seconds[s] for r in runs) for s in STAGES}
+            peak = {s: min(r.peak_kib[s] for r in runs) for s in STAGES}
+            maxrss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            rows.append({"zones": n_zones, "ranges": n_ranges, "engine": args.engine, "seconds": seconds, "peak_kib": peak})
+            print(
+                f"{n_zones:>5} {n_ranges:>6} "
+                + " ".join(f"{seconds[s]:>12.4f}" for s in STAGES)
+                + " "
+                + " ".join(f"{peak[s]:>14.0f}" for s in ("extract", "build_xml"))
+                + f" {maxrss_mib:>11.1f}"
+            )
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Geheugen en tijd van de XML-generatie (FXL en .ils): het volledige document
+in één string opbouwen tegenover de streaming writer naar een bestand.
+
+    python -m bench.bench_xml --channels 1000 10000 100000 --zones 10 100
+
+Bij streaming hoort de tracemalloc-piek vlak te blijven (ongeveer één
+chunk), ongeacht het aantal kanalen of zones.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import bipt_wwb, exclusion_builder  # noqa: E402
+from app.intervals import IntervalSet  # noqa: E402
+from app.xml_stream import encode_chunks, write_chunks  # noqa: E402
+
+
+def _measure(fn: Callable[[], object]) -> Tuple[float, float]:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--channels", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--zones", type=int, nargs="+", default=[10, 100])
+    ap.add_argument("--ranges-per-zone", type=int, default=1000)
+    args = ap.parse_args()
+
+    out = Path(tempfile.mkdtemp(prefix="wwb-bench-")) / "out.xml"
+    rnd = random.Random(0)
+    print(f"{'document':<28} {'in-memory s':>12} {'MiB':>8} {'streaming s':>12} {'MiB':>8}")
+
+    for n in args.channels:
+        # frequenties worden buiten de meting aangemaakt: enkel de writer telt
+        freqs = [rnd.uniform(470.0, 790.0) for _ in range(n)]
+        ranges = [[f, f + 0.2] for f in freqs[: n // 10]]
+        mem = _measure(lambda: "".join(exclusion_builder._iter_fxl(freqs, ranges)).encode("utf-8"))
+        stream = _measure(lambda: write_chunks(out, encode_chunks(exclusion_builder._iter_fxl(freqs, ranges))))
+        print(f"{'fxl ' + str(n) + ' channels':<28} {mem[0]:>12.3f} {mem[1]:>8.1f} {stream[0]:>12.3f} {stream[1]:>8.1f}")
+        del freqs, ranges
+
+    for z in args.zones:
+        groups = []
+        for i in range(z):
+            starts = sorted(rnd.randrange(30_000, 3_000_000) for _ in range(args.ranges_per_zone))
+            groups.append((f"Zone {i}", IntervalSet.from_pairs(((s, s + 100) for s in starts), presorted=True)))
+        mem = _measure(lambda: bipt_wwb._build_wwb_xml("Benchmark", groups).encode("utf-8"))
+        stream = _measure(lambda: write_chunks(out, encode_chunks(bipt_wwb._iter_wwb_xml("Benchmark", groups))))
+        print(f"{'ils ' + str(z) + ' zones':<28} {mem[0]:>12.3f} {mem[1]:>8.1f} {stream[0]:>12.3f} {stream[1]:>8.1f}")
+        del groups
+
+    os.unlink(out)
+
+
+if __name__ == "__main__":
+    main()
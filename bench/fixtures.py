@@ -0,0 +1,194 @@
+"""
+Synthetische BIPT-fixtures voor de benchmarks: zone-PDF's, de zonetabel
+van de micro's-pagina en een lokale HTTP-stub die ze serveert.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+LINES_PER_PAGE = 60
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(lines: List[str]) -> bytes:
+    """
+    Minimale PDF (Helvetica, één tekstregel per lijn) die pdfplumber zonder
+    extra fonts kan lezen.
+    """
+    pages = [lines[i : i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # placeholder, ingevuld na de pagina's
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids: List[int] = []
+    for page_lines in pages:
+        ops = ["BT", "/F1 9 Tf", "12 TL", "40 800 Td"]
+        for line in page_lines:
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(
+            add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                % (pages_id, font_id, content_id)
+            )
+        )
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets: List[int] = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        catalog,
+        xref_at,
+    )
+    return bytes(out)
+
+
+def _mhz(khz: int) -> str:
+    return f"{khz // 1000},{khz % 1000:03d}"
+
+
+def make_zone_lines(n_ranges: int, seed: int = 0) -> List[str]:
+    """
+    `n_ranges` tabelregels "... fmin fmax ... OK", ongeveer 1 op 5 vrijgesteld,
+    tussen wat koptekst die de parser moet negeren.
+    """
+    rnd = random.Random(seed)
+    lines = ["Belgisch Instituut voor Postdiensten en Telecommunicatie", "Frequentie fmin fmax Status"]
+    for i in range(n_ranges):
+        start = rnd.randrange(30_000, 3_000_000, 25)
+        end = start + rnd.randrange(200, 2_000, 25)
+        if i % 5 == 4:
+            lines.append(f"Vrijgesteld max 10 mW {_mhz(start)} {_mhz(end)} OK")
+        else:
+            lines.append(f"Draadloze microfoon {i + 1} {_mhz(start)} {_mhz(end)} OK")
+    lines.append("Einde van de lijst")
+    return lines
+
+
+def make_zone_html(pdf_urls: List[Tuple[str, str]]) -> str:
+    rows = "\n".join(
+        f'<tr><th>{zone}</th><td><a href="{url}">PDF</a></td></tr>' for zone, url in pdf_urls
+    )
+    return (
+        '<html><body><table class="table"><thead><tr><th>Zone</th><th>Document</th></tr></thead>'
+        f"<tbody>\n{rows}\n</tbody></table></body></html>"
+    )
+
+
+class StubServer:
+    """
+    Lokale HTTP-server die vaste bodies per pad serveert, met optionele
+    kunstmatige latency per request (om BIPT-roundtrips na te bootsen) en
+    een sterke ETag zodat conditionele GET's een 304 krijgen.
+
+    `fail[pad]` is een lijst statuscodes die eerst (één per request)
+    teruggegeven worden, om retries en de circuit breaker te testen.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.routes: Dict[str, Tuple[bytes, str]] = {}
+        self.fail: Dict[str, List[int]] = {}
+        self.latency = latency
+        self.hits: Dict[str, int] = {}
+        self.connections = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:  # noqa: N802
+                stub.hits[self.path] = stub.hits.get(self.path, 0) + 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                pending = stub.fail.get(self.path)
+                if pending:
+                    self.send_response(pending.pop(0))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                route = stub.routes.get(self.path)
+                if route is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, ctype = route
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def setup(self) -> None:
+                stub.connections += 1
+                super().setup()
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def publish_zones(stub: StubServer, n_zones: int, n_ranges: int, yy: int = 25, quarter: int = 3) -> str:
+    """
+    Registreert `n_zones` zone-PDF's plus de zonetabel op de stub en geeft de
+    URL van de micro's-pagina terug.
+    """
+    links: List[Tuple[str, str]] = []
+    for z in range(n_zones):
+        code = "Z" + "".join(chr(ord("A") + int(d)) for d in f"{z:03d}")
+        path = f"/micro/files/{code}-NL-{yy:02d}-{quarter}.pdf"
+        stub.routes[path] = (make_pdf(make_zone_lines(n_ranges, seed=z)), "application/pdf")
+        links.append((f"Zone {z + 1:03d}", stub.base_url + path))
+    stub.routes["/micro-s"] = (make_zone_html(links).encode("utf-8"), "text/html; charset=utf-8")
+    return stub.base_url + "/micro-s"